@@ -1,12 +1,19 @@
 # -*- coding: utf-8 -*-
 import autocomplete_light
 from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.core.exceptions import ValidationError
 from django.db.models import Q
 from django.utils.html import format_html
 from profiles.models import Profile
 from video.models import Webcam, PointWebcam, Config
+from video.utils import ADMIN_RESPONSIBLES_CACHE_KEY, get_responsible_names, get_video_cache, \
+    is_video_cache_shared
+
+ADMIN_RESPONSIBLES_TIMEOUT = getattr(settings, 'VIDEO_ADMIN_RESPONSIBLES_TIMEOUT', 24*60*60)
+ADMIN_RESPONSIBLES_LOCAL_TIMEOUT = getattr(settings, 'VIDEO_ADMIN_RESPONSIBLES_LOCAL_TIMEOUT', 30)
 
 
 class WebcamAdminForm(forms.ModelForm):
@@ -52,6 +59,31 @@ class WebcamInline(admin.StackedInline):
     exclude = ['online']
 
 
+def get_admin_responsibles():
+    """
+    Ответственные, за которыми закреплены камеры: кортеж пар (id,
+    ``get_full_name()``) по алфавиту. Хранится в кеше видеоконтроля,
+    сбрасывается сигналами сохранения и удаления камер и профилей (см.
+    video.signals). Без общего кеша сброс доходит только до сохранившего
+    процесса, поэтому справочник хранится ``ADMIN_RESPONSIBLES_LOCAL_TIMEOUT``
+    секунд.
+    """
+    cache = get_video_cache()
+    responsibles = cache.get(ADMIN_RESPONSIBLES_CACHE_KEY)
+    if responsibles is None:
+        responsibles = tuple(sorted(get_responsible_names().items(), key=lambda item: (item[1], item[0])))
+        timeout = ADMIN_RESPONSIBLES_TIMEOUT if is_video_cache_shared(cache) else ADMIN_RESPONSIBLES_LOCAL_TIMEOUT
+        cache.set(ADMIN_RESPONSIBLES_CACHE_KEY, responsibles, timeout)
+    return responsibles
+
+
+def get_int_param(request, name):
+    try:
+        return int(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+
 class PointWebcamStatusListFilter(admin.SimpleListFilter):
     title = u'Статус'
     parameter_name = 'status'
@@ -60,12 +92,16 @@ class PointWebcamStatusListFilter(admin.SimpleListFilter):
         return Webcam.WEBCAM_STATUS_CHOICES
 
     def queryset(self, request, queryset):
-        if self.value() and int(self.value()) > -1:
-            return queryset.extra(
-                where=[
-                    "video_webcam.online='%d'" % int(self.value()),
-                ]
-            )
+        # Условие накладывается в PointWebcamAdmin.get_queryset на тот же
+        # JOIN с камерами, что и колонки списка
+        return queryset
+
+    @staticmethod
+    def get_q(request):
+        status = get_int_param(request, PointWebcamStatusListFilter.parameter_name)
+        if status is not None and status > -1:
+            return Q(webcams__online=status)
+        return None
 
 
 class PointWebcamResponsibleFilter(admin.SimpleListFilter):
@@ -73,21 +109,20 @@ class PointWebcamResponsibleFilter(admin.SimpleListFilter):
     parameter_name = 'responsible'
 
     def lookups(self, request, model_admin):
-        qs = Profile.objects.filter(responsibles__isnull=False)\
-            .order_by('id')\
-            .select_related('responsibles')\
-            .distinct('id')
         return tuple(
-            (str(rsp.id), rsp.get_full_name()) for rsp in qs
+            (str(responsible_id), name) for responsible_id, name in get_admin_responsibles()
         )
 
     def queryset(self, request, queryset):
-        if self.value() and int(self.value()) > 0:
-            return queryset.extra(
-                where=[
-                    "video_webcam.responsible_id='%d'" % int(self.value()),
-                ]
-            )
+        # См. PointWebcamStatusListFilter.queryset
+        return queryset
+
+    @staticmethod
+    def get_q(request):
+        responsible_id = get_int_param(request, PointWebcamResponsibleFilter.parameter_name)
+        if responsible_id is not None and responsible_id > 0:
+            return Q(webcams__responsible_id=responsible_id)
+        return None
 
 
 class PointWebcamAdminForm(forms.ModelForm):
@@ -98,6 +133,26 @@ class PointWebcamAdminForm(forms.ModelForm):
         }
 
 
+class PointWebcamChangeList(ChangeList):
+
+    def get_results(self, request):
+        super(PointWebcamChangeList, self).get_results(request)
+        self.result_list = list(self.result_list)
+        # Имена ответственных - из закешированного справочника фильтра,
+        # недостающие в нем (справочник еще не обновился) - одним запросом
+        names = dict(get_admin_responsibles())
+        missing = set(
+            obj.wc_responsible for obj in self.result_list
+            if obj.wc_responsible and obj.wc_responsible not in names
+        )
+        if missing:
+            names.update(
+                (profile.id, profile.get_full_name()) for profile in Profile.objects.filter(id__in=missing)
+            )
+        for obj in self.result_list:
+            obj.wc_responsible_name = names.get(obj.wc_responsible, '')
+
+
 class PointWebcamAdmin(admin.ModelAdmin):
     list_display = (
         'spid',
@@ -146,9 +201,7 @@ class PointWebcamAdmin(admin.ModelAdmin):
     wc_installed.short_description = u'Установлена'
 
     def wc_responsible(self, obj):
-        if obj.wc_responsible:
-            return Profile.objects.get(id=obj.wc_responsible).get_full_name()
-        return ''
+        return getattr(obj, 'wc_responsible_name', '')
     wc_responsible.admin_order_field = 'wc_responsible'
     wc_responsible.short_description = u'Ответственный'
 
@@ -184,10 +237,12 @@ class PointWebcamAdmin(admin.ModelAdmin):
         if column == 'get_webcams':
             return {'style': 'width:50%;'}
 
+    def get_changelist(self, request, **kwargs):
+        return PointWebcamChangeList
+
     def get_object(self, request, object_id):
-        """
-        """
-        queryset = self.get_queryset(request).distinct('spid')
+        # Страница точки не нуждается в строках камер из списка
+        queryset = super(PointWebcamAdmin, self).get_queryset(request)
         model = queryset.model
         try:
             object_id = model._meta.pk.to_python(object_id)
@@ -196,8 +251,19 @@ class PointWebcamAdmin(admin.ModelAdmin):
             return None
 
     def get_queryset(self, request):
+        """
+        Строка списка - пара (точка, камера): один LEFT JOIN с video_webcam,
+        точки без камер попадают в список с пустыми полями камеры.
+        """
         q = (Q(webcams__isnull=True) | Q(webcams__isnull=False))
-        return PointWebcam.objects.filter(q).prefetch_related('webcams', 'webcams__responsible',)\
+        # Условия фильтров по камере добавляются в тот же filter(), иначе
+        # Django построит для них второй JOIN, а extra-колонки ссылаются
+        # на первый
+        for list_filter in (PointWebcamStatusListFilter, PointWebcamResponsibleFilter):
+            filter_q = list_filter.get_q(request)
+            if filter_q is not None:
+                q &= filter_q
+        return PointWebcam.objects.filter(q).select_related('city')\
             .extra(select={
                 'wc_installed': "video_webcam.installed",
                 'wc_responsible': "video_webcam.responsible_id",
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from bisect import bisect_left
+from threading import Lock
+from time import time
+
+from django.conf import settings
+
+from video.api.filtering import get_lookup_path
+from video.api.pagination import get_attr_chain
+from video.api.params import PARAMS_META
+from video.models import Webcam
+from video.utils import get_responsible_names
+
+AUTOCOMPLETE_TTL = getattr(settings, 'VIDEO_AUTOCOMPLETE_TTL', 10*60)
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_MAX_LIMIT = 100
+RESPONSIBLE_FIELD = 'responsible.last_name'
+POINT_PREFIX = 'point.'
+POINT_PATH_PREFIX = 'point__'
+
+# Поля с автодополнением по значениям из БД (статус и дата архива
+# обрабатываются отдельно)
+AUTOCOMPLETE_FIELDS = tuple(
+    field for field, meta in PARAMS_META.items()
+    if field not in ('online', 'livestream_url')
+)
+
+
+def format_value(value):
+    if value is None:
+        return None
+    if hasattr(value, 'strftime'):
+        return value.strftime('%d.%m.%Y')
+    return unicode(value)
+
+
+class FieldIndex(object):
+    """
+    Отсортированный список различных значений одного поля: поиск по
+    префиксу - двоичный, по подстроке - линейный проход без запросов к БД.
+    """
+
+    def __init__(self, values):
+        self.entries = sorted(set((value.lower(), value) for value in values if value))
+        self.keys = [key for key, value in self.entries]
+        self.built = time()
+
+    def add(self, value):
+        if not value:
+            return
+        entry = (value.lower(), value)
+        pos = bisect_left(self.entries, entry)
+        if pos < len(self.entries) and self.entries[pos] == entry:
+            return
+        self.entries.insert(pos, entry)
+        self.keys.insert(pos, entry[0])
+
+    def search(self, q, limit):
+        q = q.lower()
+        result = []
+        pos = bisect_left(self.keys, q)
+        while pos < len(self.keys) and len(result) < limit and self.keys[pos].startswith(q):
+            result.append(self.entries[pos][1])
+            pos += 1
+        if len(result) < limit and q:
+            for key, value in self.entries:
+                if q in key and not key.startswith(q):
+                    result.append(value)
+                    if len(result) >= limit:
+                        break
+        return result
+
+
+class AutocompleteIndex(object):
+    """
+    Индекс значений полей списка камер для автодополнения. Индекс поля
+    строится из БД при первом обращении и пополняется сигналами сохранения
+    ``Webcam`` и ``Point``. Удаление объекта сбрасывает индексы, через
+    ``ttl`` секунд индекс строится заново (так уходят устаревшие значения
+    и изменения из других процессов).
+    """
+
+    def __init__(self, ttl=AUTOCOMPLETE_TTL):
+        self.ttl = ttl
+        self.indexes = {}
+        self._lock = Lock()
+
+    def load_values(self, field):
+        if field == RESPONSIBLE_FIELD:
+            # Подписи как в строках списка (ResponsibleSerializer)
+            return get_responsible_names().values()
+        path = get_lookup_path(field)
+        return (
+            format_value(value)
+            for value in Webcam.objects.values_list(path, flat=True).distinct()
+        )
+
+    def get_index(self, field):
+        with self._lock:
+            index = self.indexes.get(field)
+        if index is None or time() - index.built > self.ttl:
+            index = FieldIndex(self.load_values(field))
+            with self._lock:
+                self.indexes[field] = index
+        return index
+
+    def search(self, field, q, limit=AUTOCOMPLETE_LIMIT):
+        index = self.get_index(field)
+        with self._lock:
+            return index.search(q, limit)
+
+    def get_instance_value(self, field, instance, is_point=False):
+        if field == RESPONSIBLE_FIELD:
+            if instance.responsible_id is None:
+                return None
+            return instance.responsible.get_full_name()
+        path = get_lookup_path(field)
+        if is_point:
+            path = path[len(POINT_PATH_PREFIX):]
+        return format_value(get_attr_chain(instance, path))
+
+    def add_instance(self, instance, is_point=False):
+        """
+        Добавляет значения сохраненной камеры (или точки при ``is_point``)
+        в уже построенные индексы.
+        """
+        with self._lock:
+            indexes = self.indexes.items()
+        for field, index in indexes:
+            if is_point != field.startswith(POINT_PREFIX):
+                continue
+            value = self.get_instance_value(field, instance, is_point)
+            with self._lock:
+                index.add(value)
+
+    def clear(self):
+        with self._lock:
+            self.indexes.clear()
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import csv
+import json
+import tempfile
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.encoding import force_bytes
+from openpyxl import Workbook
+
+from video.api.serializers import PointWebcamSerializer, prefetch_live_stream_urls
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'VIDEO_EXPORT_CHUNK_SIZE', 500)
+FILE_CHUNK_SIZE = 64*1024
+LINES_PER_CHUNK = 200
+
+
+class ChainedAttrDict(object):
+    def __init__(self, _dict):
+        self.dict = _dict
+
+    def __getitem__(self, item_chain):
+        val = self.dict
+        for key in item_chain.split('.'):
+            val = val[key]
+        return val
+
+
+def iter_serialized(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Сериализованные камеры порциями по ``chunk_size``: в памяти никогда
+    не находится больше одной порции объектов.
+    """
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    queryset = queryset.order_by(*(ordering + ['pk']))
+    start = 0
+    while True:
+        chunk = prefetch_live_stream_urls(queryset[start:start + chunk_size])
+        if not chunk:
+            break
+        for obj in PointWebcamSerializer(chunk, many=True).data:
+            yield obj
+        start += chunk_size
+
+
+def iter_file(fh, chunk_size=FILE_CHUNK_SIZE):
+    try:
+        while True:
+            data = fh.read(chunk_size)
+            if not data:
+                break
+            yield data
+    finally:
+        fh.close()
+
+
+class BaseExport(object):
+    """
+    Выгрузка списка камер. ``columns`` - список ``{'field': ..., 'name': ...}``
+    (см. ``PointWebcamListXlsView.get_visible_cols``), ``objects`` - итератор
+    сериализованных камер.
+    """
+    content_type = None
+    extension = None
+
+    def __init__(self, columns, objects):
+        self.columns = columns
+        self.objects = objects
+
+    def get_value(self, obj, field):
+        try:
+            value = ChainedAttrDict(obj)[field]
+        except (KeyError, TypeError):
+            return ''
+        if isinstance(value, dict):
+            return value.get('status_name', '')
+        return value if value is not None else ''
+
+    def iter_rows(self):
+        for obj in self.objects:
+            yield [self.get_value(obj, col['field']) for col in self.columns]
+
+    def write(self, fh):
+        raise NotImplementedError
+
+    def stream(self):
+        fh = tempfile.TemporaryFile()
+        self.write(fh)
+        fh.seek(0)
+        return iter_file(fh)
+
+
+class XlsxExport(BaseExport):
+    content_type = 'application/vnd.ms-excel'
+    extension = 'xlsx'
+
+    def write(self, fh):
+        # write-only книга держит в памяти только текущую строку
+        book = Workbook(write_only=True)
+        sheet = book.create_sheet(title=u'Камеры видеоконтроля')
+        sheet.append([col['name'] for col in self.columns])
+        for row in self.iter_rows():
+            sheet.append(row)
+        book.save(fh)
+
+
+class EchoBuffer(object):
+    """
+    Псевдофайл для csv.writer: ``write`` возвращает строку, а не пишет ее.
+    """
+    def write(self, value):
+        return value
+
+
+class LineExport(BaseExport):
+    """
+    Построчные форматы: строки формируются по одной и отдаются пачками
+    по ``LINES_PER_CHUNK``, временный файл не нужен.
+    """
+
+    def iter_lines(self):
+        raise NotImplementedError
+
+    def stream(self):
+        lines = []
+        for line in self.iter_lines():
+            lines.append(line)
+            if len(lines) >= LINES_PER_CHUNK:
+                yield b''.join(lines)
+                lines = []
+        if lines:
+            yield b''.join(lines)
+
+    def write(self, fh):
+        for data in self.stream():
+            fh.write(data)
+
+
+class CsvExport(LineExport):
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    def iter_lines(self):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow([force_bytes(col['name']) for col in self.columns])
+        for row in self.iter_rows():
+            yield writer.writerow([force_bytes(value) for value in row])
+
+
+class NdjsonExport(LineExport):
+    content_type = 'application/x-ndjson'
+    extension = 'ndjson'
+
+    def iter_lines(self):
+        fields = [col['field'] for col in self.columns]
+        for row in self.iter_rows():
+            yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + b'\n'
+
+
+EXPORT_FORMATS = {
+    export.extension: export for export in (XlsxExport, CsvExport, NdjsonExport)
+}
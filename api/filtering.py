@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from collections import OrderedDict
+from datetime import datetime
+import json
+from threading import Lock
+
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+
+from video.api.params import FILTER_PARAMS, PARAMS_META
+from video.models import Webcam
+
+ARCHIVE_DATE_FIELD = 'archive_date'
+COMPILED_FILTERS_MAX_SIZE = 256
+
+# Допустимые операторы для каждого фильтруемого поля
+FILTER_OPERATORS = dict(
+    (fp['field'], frozenset(op['query_name'] for op in fp['filter_params']))
+    for fp in FILTER_PARAMS if fp.get('filter_params')
+)
+FILTER_OPERATORS[ARCHIVE_DATE_FIELD] = frozenset(('=',))
+
+# Поля, которые в ORM фильтруются не по одноименному пути
+FILTER_LOOKUPS = {
+    'point.trade_network': 'point__trade_network__name',
+}
+
+
+def get_lookup_path(field):
+    """
+    Путь ORM для поля списка (``point.city.name`` -> ``point__city__name``).
+    """
+    return FILTER_LOOKUPS.get(field, field.replace('.', '__'))
+
+
+class CompiledFilter(object):
+    """
+    Результат разбора ``filters``: условие отбора ``q``, одно условие
+    исключения ``exclude`` (или ``None``) и даты архива, по которым точки
+    определяются уже при построении запроса.
+    """
+
+    def __init__(self, q=None, exclude=None, archive_dates=()):
+        self.q = q if q is not None else Q()
+        self.exclude = exclude
+        self.archive_dates = tuple(archive_dates)
+
+    def get_q(self, archive_spids=None):
+        q = self.q
+        if archive_spids is not None:
+            q &= Q(point__spid__in=archive_spids)
+        if self.exclude is not None:
+            q &= ~self.exclude
+        return q
+
+
+class FilterCompiler(object):
+    """
+    Разбирает ``filters`` вида ``{"field": [["gt", "value"], ...]}``.
+    Условия одного поля объединяются через OR, разных полей - через AND,
+    все ``!=`` собираются в одно исключение. Результаты запоминаются по
+    исходной и по канонической строке фильтра.
+    """
+
+    def __init__(self, max_size=COMPILED_FILTERS_MAX_SIZE):
+        self.max_size = max_size
+        self._compiled = OrderedDict()
+        self._lock = Lock()
+
+    def _get(self, key):
+        with self._lock:
+            compiled = self._compiled.pop(key, None)
+            if compiled is not None:
+                self._compiled[key] = compiled
+            return compiled
+
+    def _set(self, key, compiled):
+        with self._lock:
+            self._compiled.pop(key, None)
+            self._compiled[key] = compiled
+            while len(self._compiled) > self.max_size:
+                self._compiled.popitem(last=False)
+
+    def compile(self, raw):
+        if not raw:
+            return CompiledFilter()
+        compiled = self._get(raw)
+        if compiled is None:
+            try:
+                parsed = json.loads(raw)
+            except (TypeError, ValueError):
+                raise ParseError('filters: некорректный JSON')
+            canonical = json.dumps(parsed, sort_keys=True)
+            compiled = self._get(canonical)
+            if compiled is None:
+                compiled = self.build(parsed)
+                self._set(canonical, compiled)
+            self._set(raw, compiled)
+        return compiled
+
+    def build(self, parsed):
+        if not isinstance(parsed, dict):
+            raise ParseError('filters: ожидается объект')
+        q, exclude, archive_dates = Q(), None, []
+        for field, conditions in sorted(parsed.items()):
+            field = field.strip()
+            if field not in FILTER_OPERATORS:
+                raise ParseError('filters: неизвестное поле {}'.format(field))
+            if not isinstance(conditions, list):
+                raise ParseError('filters: ожидается список условий для {}'.format(field))
+            field_q = Q()
+            for condition in conditions:
+                try:
+                    oper, value = condition
+                except (TypeError, ValueError):
+                    raise ParseError('filters: ожидается пара [оператор, значение] для {}'.format(field))
+                if oper not in FILTER_OPERATORS[field]:
+                    raise ParseError('filters: недопустимый оператор {} для {}'.format(oper, field))
+                if field == ARCHIVE_DATE_FIELD:
+                    archive_dates.append(self.normalize_date(field, value).strftime('%d.%m.%Y'))
+                    continue
+                lookup = self.get_lookup(field, oper, self.normalize_value(field, value))
+                if oper == '!=':
+                    exclude = lookup if exclude is None else exclude | lookup
+                else:
+                    field_q |= lookup
+            q &= field_q
+        return CompiledFilter(q, exclude, archive_dates)
+
+    def normalize_date(self, field, value):
+        try:
+            return datetime.strptime(value, '%d.%m.%Y').date()
+        except (TypeError, ValueError):
+            raise ParseError('filters: некорректная дата {!r} для {}'.format(value, field))
+
+    def normalize_value(self, field, value):
+        if PARAMS_META[field]['type'] == 'date':
+            return self.normalize_date(field, value)
+        if field == 'online':
+            try:
+                status = Webcam.WEBCAM_STATUS_CHOICES.get_value_by_display_name(value)
+            except (KeyError, ValueError):
+                status = None
+            if status is None:
+                raise ParseError('filters: неизвестный статус {!r}'.format(value))
+            return status
+        if not isinstance(value, (basestring, int, long)):
+            raise ParseError('filters: некорректное значение для {}'.format(field))
+        return value
+
+    def get_lookup(self, field, oper, value):
+        if field == 'responsible.last_name':
+            # Значение - полное имя "Фамилия Имя" из ResponsibleSerializer
+            names = unicode(value).split()
+            lookup = {'responsible__last_name': names[0] if names else ''}
+            if len(names) > 1:
+                lookup['responsible__first_name'] = names[1]
+            return Q(**lookup)
+        path = get_lookup_path(field)
+        if oper not in ('=', '!='):
+            path = '{}__{}'.format(path, oper)
+        return Q(**{path: value})
+
+
+filter_compiler = FilterCompiler()
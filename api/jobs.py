@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+from hashlib import sha1
+import json
+import logging
+from multiprocessing.pool import ThreadPool
+import os
+import tempfile
+from threading import Lock
+from time import time
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import connection
+
+from video.api.exports import EXPORT_CHUNK_SIZE, iter_serialized
+from video.utils import get_shared_video_cache
+
+EXPORT_ROOT = getattr(settings, 'VIDEO_EXPORT_ROOT', os.path.join(tempfile.gettempdir(), 'video_exports'))
+EXPORT_WORKERS = getattr(settings, 'VIDEO_EXPORT_WORKERS', 2)
+EXPORT_JOB_REUSE = getattr(settings, 'VIDEO_EXPORT_JOB_REUSE', 5*60)
+EXPORT_JOB_TTL = getattr(settings, 'VIDEO_EXPORT_JOB_TTL', 24*60*60)
+EXPORT_JOB_STALE = getattr(settings, 'VIDEO_EXPORT_JOB_STALE', 60)
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPool(EXPORT_WORKERS)
+    return _pool
+
+
+def job_key(job_id):
+    return 'video:export:job:{}'.format(job_id)
+
+
+def params_key(params_hash):
+    return 'video:export:params:{}'.format(params_hash)
+
+
+def get_params_hash(params, user_id):
+    return sha1(json.dumps([params, user_id], sort_keys=True)).hexdigest()
+
+
+def get_job(job_id):
+    return get_shared_video_cache().get(job_key(job_id))
+
+
+def save_job(job, **changes):
+    job.update(changes, updated=time())
+    get_shared_video_cache().set(job_key(job['id']), job, EXPORT_JOB_TTL)
+    return job
+
+
+def is_job_reusable(job):
+    """
+    Готовая выгрузка с файлом или выполняющаяся, состояние которой
+    обновлялось не позже ``EXPORT_JOB_STALE`` секунд назад (иначе выполнявший
+    ее процесс, скорее всего, перезапущен).
+    """
+    if job['status'] == JOB_DONE:
+        return os.path.exists(get_job_path(job))
+    if job['status'] in (JOB_PENDING, JOB_RUNNING):
+        return time() - job.get('updated', job['created']) < EXPORT_JOB_STALE
+    return False
+
+
+def get_job_data(job):
+    return {
+        key: job[key]
+        for key in ('id', 'format', 'status', 'rows_done', 'rows_total', 'created', 'finished', 'error')
+    }
+
+
+def get_job_path(job):
+    return os.path.join(EXPORT_ROOT, '{id}.{ext}'.format(id=job['id'], ext=job['format']))
+
+
+def cleanup_exports():
+    """
+    Удаляет файлы выгрузок старше ``EXPORT_JOB_TTL``.
+    """
+    if not os.path.isdir(EXPORT_ROOT):
+        return
+    expired = time() - EXPORT_JOB_TTL
+    for name in os.listdir(EXPORT_ROOT):
+        path = os.path.join(EXPORT_ROOT, name)
+        try:
+            if os.path.getmtime(path) < expired:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def submit_export(queryset, columns, export_class, params, user_id):
+    """
+    Ставит выгрузку в очередь локального пула потоков. Если такая же
+    выгрузка (те же параметры и пользователь) запускалась не раньше
+    ``EXPORT_JOB_REUSE`` секунд назад и готова или еще выполняется (см.
+    ``is_job_reusable``), возвращается она.
+
+    Состояние задач хранится в общем кеше ``VIDEO_CACHE_ALIAS`` (без него
+    возбуждается ``ImproperlyConfigured``), файлы - в ``EXPORT_ROOT`` на
+    локальном диске, поэтому все процессы приложения должны работать на
+    одном хосте.
+    """
+    cache = get_shared_video_cache()
+    params_hash = get_params_hash(params, user_id)
+    job_id = cache.get(params_key(params_hash))
+    if job_id:
+        job = get_job(job_id)
+        if job and is_job_reusable(job):
+            return job
+
+    cleanup_exports()
+    job = save_job({
+        'id': uuid4().hex,
+        'user_id': user_id,
+        'format': export_class.extension,
+        'status': JOB_PENDING,
+        'rows_done': 0,
+        'rows_total': None,
+        'created': time(),
+        'finished': None,
+        'error': None,
+    })
+    cache.set(params_key(params_hash), job['id'], EXPORT_JOB_REUSE)
+    get_pool().apply_async(run_export, (dict(job), queryset, columns, export_class))
+    return job
+
+
+def iter_with_progress(job, objects):
+    rows_done = 0
+    for obj in objects:
+        yield obj
+        rows_done += 1
+        if not rows_done % EXPORT_CHUNK_SIZE:
+            save_job(job, rows_done=rows_done)
+    save_job(job, rows_done=rows_done)
+
+
+def run_export(job, queryset, columns, export_class):
+    path = get_job_path(job)
+    tmp_path = path + '.part'
+    try:
+        save_job(job, status=JOB_RUNNING, rows_total=queryset.count())
+        try:
+            os.makedirs(EXPORT_ROOT)
+        except OSError:
+            if not os.path.isdir(EXPORT_ROOT):
+                raise
+        with open(tmp_path, 'wb') as fh:
+            export_class(columns, iter_with_progress(job, iter_serialized(queryset))).write(fh)
+        os.rename(tmp_path, path)
+        save_job(job, status=JOB_DONE, finished=time())
+    except Exception as e:
+        logger.exception('Webcam export job %s failed', job['id'])
+        save_job(job, status=JOB_FAILED, finished=time(), error=unicode(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    finally:
+        connection.close()
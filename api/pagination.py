@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Field, FieldDoesNotExist, Q
+from rest_framework.exceptions import ParseError
+
+
+def get_attr_chain(obj, path):
+    for attr in path.split('__'):
+        if obj is None:
+            break
+        obj = getattr(obj, attr)
+    return obj
+
+
+def is_scalar_path(model, path):
+    """
+    Ведет ли путь ORM ``path`` к обычной колонке (не к связанному объекту).
+    """
+    field = None
+    for name in path.split('__'):
+        if field is not None:
+            model = field.rel.to
+        try:
+            field = model._meta.get_field_by_name(name)[0]
+        except FieldDoesNotExist:
+            return False
+        if not isinstance(field, Field):
+            return False
+    return field.rel is None
+
+
+class KeysetPaginator(object):
+    """
+    Постраничный вывод по курсору: страница выбирается условием на
+    значения колонок сортировки последней показанной строки, а не OFFSET,
+    поэтому время ответа не зависит от глубины прокрутки.
+
+    ``ordering`` должен однозначно упорядочивать строки (последним идет
+    ``id``). NULL учитываются так, как их сортирует PostgreSQL: в конце
+    при ASC и в начале при DESC. С ``model`` сортировка по связанному
+    объекту (ее порядок задает Meta.ordering другой модели, а значение не
+    попадает в курсор) отклоняется.
+    """
+
+    def __init__(self, ordering, page_size, model=None):
+        self.ordering = [
+            (field.lstrip('-'), field.startswith('-')) for field in ordering
+        ]
+        self.page_size = page_size
+        if model is not None:
+            for field, desc in self.ordering:
+                if not is_scalar_path(model, field):
+                    raise ParseError('sort_by: сортировка по {} не поддерживается'.format(field))
+
+    def encode_cursor(self, obj, reverse):
+        position = [get_attr_chain(obj, field) for field, desc in self.ordering]
+        data = json.dumps({'p': position, 'r': reverse}, cls=DjangoJSONEncoder)
+        return urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            position, reverse = data['p'], bool(data['r'])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise ParseError('cursor: некорректный курсор')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise ParseError('cursor: курсор не соответствует сортировке')
+        return position, reverse
+
+    def get_after_q(self, field, value, desc):
+        if value is None:
+            return Q(**{'{}__isnull'.format(field): False}) if desc else None
+        if desc:
+            return Q(**{'{}__lt'.format(field): value})
+        return Q(**{'{}__gt'.format(field): value}) | Q(**{'{}__isnull'.format(field): True})
+
+    def get_position_q(self, position, reverse):
+        """
+        Строки, идущие после ``position``: (a > va) OR (a = va AND b > vb) ...
+        """
+        result, equal = None, Q()
+        for (field, desc), value in zip(self.ordering, position):
+            after = self.get_after_q(field, value, desc != reverse)
+            if after is not None:
+                result = (equal & after) if result is None else result | (equal & after)
+            if value is None:
+                equal &= Q(**{'{}__isnull'.format(field): True})
+            else:
+                equal &= Q(**{field: value})
+        return result
+
+    def get_order_by(self, reverse):
+        return [
+            '{}{}'.format('-' if desc != reverse else '', field)
+            for field, desc in self.ordering
+        ]
+
+    def paginate(self, queryset, cursor):
+        """
+        Возвращает (объекты страницы, курсор следующей, курсор предыдущей).
+        """
+        position, reverse = self.decode_cursor(cursor)
+        if position is not None:
+            position_q = self.get_position_q(position, reverse)
+            if position_q is None:
+                return [], None, None
+            queryset = queryset.filter(position_q)
+        items = list(queryset.order_by(*self.get_order_by(reverse))[:self.page_size + 1])
+        has_more = len(items) > self.page_size
+        items = items[:self.page_size]
+        if reverse:
+            items.reverse()
+        if not items:
+            return items, None, None
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else position is not None
+        return (
+            items,
+            self.encode_cursor(items[-1], False) if has_next else None,
+            self.encode_cursor(items[0], True) if has_previous else None,
+        )
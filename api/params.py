@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from collections import Mapping, OrderedDict
+from hashlib import md5
+import json
+
+LESS_PARAMS = [
+    {"query_name": "=", "name": "="},
+    {"query_name": "!=", "name": "!="}
+]
+
+MORE_PARAMS = [
+    {"query_name": "=", "name": "="},
+    {"query_name": "!=", "name": "!="},
+    {"query_name": "gt", "name": ">"},
+    {"query_name": "gte", "name": ">="},
+    {"query_name": "lt", "name": "<"},
+    {"query_name": "lte", "name": "<="}
+]
+
+FILTER_PARAMS = [
+    {
+        "field": "point.name",
+        "is_visible_in_list": True,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "Точка продаж",
+    },
+    {
+        "field": "point.spid",
+        "is_visible_in_list": True,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "ID точки продаж",
+    },
+    {
+        "field": "point.trade_network",
+        "is_visible_in_list": True,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "Торговая сеть",
+    },
+    {
+        "field": "point.city.name",
+        "is_visible_in_list": True,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "Город",
+    },
+    {
+        "field": "point.address",
+        "is_visible_in_list": True,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "Адрес",
+    },
+    {
+        "field": "id",
+        "is_visible_in_list": False,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "ID камеры",
+    },
+    {
+        "field": "name",
+        "is_visible_in_list": True,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "Название камеры",
+    },
+    {
+        "field": "slug",
+        "is_visible_in_list": False,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "Slug",
+    },
+    {
+        "field": "responsible.last_name",
+        "is_visible_in_list": True,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "Ответственный",
+    },
+    {
+        "field": "online",
+        "is_visible_in_list": True,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "Статус",
+    },
+    {
+        "field": "ip",
+        "is_visible_in_list": True,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": LESS_PARAMS,
+        "field_name": "IP-адрес камеры",
+    },
+    {
+        "field": "installed",
+        "is_visible_in_list": True,
+        "type": "date",
+        "is_group": False,
+        "aggregation_params": None,
+        "filter_params": MORE_PARAMS,
+        "field_name": "Дата подключения",
+    },
+    {
+        "field": "livestream_url",
+        "is_visible_in_list": False,
+        "type": "str",
+        "is_group": False,
+        "aggregation_params": None,
+        # "filter_params": LESS_PARAMS,
+        "field_name": "URL трансляции",
+    },
+]
+
+
+class ReadOnlyDict(Mapping):
+    """
+    Неизменяемая обертка над словарем, сохраняющая порядок ключей.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._data = OrderedDict(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return 'ReadOnlyDict({!r})'.format(self._data.items())
+
+
+# Реестр параметров списка камер: поле -> тип, название, видимость.
+# Строится один раз при импорте.
+PARAMS_META = ReadOnlyDict(
+    (fp['field'], ReadOnlyDict(
+        type=fp['type'],
+        name=fp['field_name'],
+        visible=fp['is_visible_in_list'],
+    ))
+    for fp in FILTER_PARAMS
+)
+
+FILTER_PARAMS_ETAG = md5(json.dumps(FILTER_PARAMS, sort_keys=True)).hexdigest()
+
+
+def get_param_type(field):
+    meta = PARAMS_META.get(field)
+    return meta['type'] if meta else None
+
+
+def is_date_param(field):
+    return get_param_type(field) == 'date'
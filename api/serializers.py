@@ -5,6 +5,19 @@ from profiles.models import Profile
 from sales_points.models import Point
 from tracking.api.serializers import PointSerializer
 from video.models import Webcam, PointWebcamFilterTemplate
+from video.utils import live_stream_url_builder
+
+
+def prefetch_live_stream_urls(webcams):
+    """
+    Подписывает ссылки на трансляции для всей страницы камер за один проход;
+    точки должны быть загружены (select_related).
+    """
+    webcams = list(webcams)
+    urls = live_stream_url_builder.build((cam.point.spid, cam.slug) for cam in webcams)
+    for cam, url in zip(webcams, urls):
+        cam._live_stream_url = url
+    return webcams
 
 
 class ResponsibleSerializer(serializers.ModelSerializer):
@@ -72,7 +85,10 @@ class PointWebcamSerializer(serializers.ModelSerializer):
         }
 
     def get_livestream_url(self, obj):
-        return obj.live_stream_url()
+        try:
+            return obj._live_stream_url
+        except AttributeError:
+            return obj.live_stream_url()
 
 
 class PointWebcamFilterTemplateSerializer(serializers.ModelSerializer):
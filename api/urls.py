@@ -3,7 +3,8 @@ from django.conf import urls
 from rest_framework import routers
 
 from .views import PointWebcamList, PointWebcamFilterParamList, PointWebcamFieldAutocomplete, PointWebcamMonitor, PointWebcamArchiveList, \
-    PointWebcamListXlsView, PoinWebcamFilterTemplateViewSet
+    PointWebcamListXlsView, PoinWebcamFilterTemplateViewSet, PointWebcamExportJobList, PointWebcamExportJobDetail, \
+    PointWebcamExportJobDownload, PointWebcamArchiveBatchList
 
 router = routers.SimpleRouter()
 router.register(r'pointwebcamlist/filter-template', PoinWebcamFilterTemplateViewSet, base_name='webcam_filter_template')
@@ -15,10 +16,26 @@ urlpatterns = urls.patterns(
     urls.url(r'^pointwebcamlist/filter-params/$', PointWebcamFilterParamList.as_view(), name="pointwebcam_filter_param_list"),
     urls.url(r'^pointwebcamlist/field-autocomplete/$', PointWebcamFieldAutocomplete.as_view(), name="pointwebcam_field_autocomplete"),
     urls.url(r'^pointwebcamlist/check-status/$', PointWebcamMonitor.as_view(), name='pointwebcam_monitor'),
+    urls.url(
+        r'^pointwebcamlist/archive-list/batch/$',
+        PointWebcamArchiveBatchList.as_view(),
+        name='pointwebcam_archive_batch_list'
+    ),
     urls.url(
         r'^pointwebcamlist/archive-list/(?P<spid>[0-9A-Za-z-]+)/(?P<slug>[0-9A-Za-z-]+)/$',
         PointWebcamArchiveList.as_view(),
         name='pointwebcam_archive_list'
     ),
     urls.url(r'^pointwebcamlist/export/$', PointWebcamListXlsView.as_view(), name="pointwebcam_export"),
+    urls.url(r'^pointwebcamlist/export-jobs/$', PointWebcamExportJobList.as_view(), name="pointwebcam_export_job_list"),
+    urls.url(
+        r'^pointwebcamlist/export-jobs/(?P<job_id>[0-9a-f]+)/$',
+        PointWebcamExportJobDetail.as_view(),
+        name="pointwebcam_export_job_detail"
+    ),
+    urls.url(
+        r'^pointwebcamlist/export-jobs/(?P<job_id>[0-9a-f]+)/download/$',
+        PointWebcamExportJobDownload.as_view(),
+        name="pointwebcam_export_job_download"
+    ),
 )
\ No newline at end of file
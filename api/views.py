@@ -1,40 +1,50 @@
 # -*- coding: utf-8 -*-
 import ast
 from collections import OrderedDict
-from datetime import datetime
+from hashlib import md5
 import json
 import os
-import tempfile
+from time import time
 
 from django.conf import settings
 from django.db.models import Q
-from django.http import Http404, HttpResponse
+from django.http import Http404, StreamingHttpResponse
 from django.utils import timezone
-import requests
-from requests.exceptions import RequestException
-from rest_framework import filters
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import filters, status
+from rest_framework.exceptions import ParseError
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
+from rest_framework.templatetags.rest_framework import replace_query_param
 from rest_framework.views import APIView
 
 from rest_framework.viewsets import ModelViewSet
 
-from snippets.utils.excel import NewExcelHelper
-from video.api.serializers import PointWebcamSerializer, PointWebcamFilterTemplateSerializer
+from video.api.autocomplete import AUTOCOMPLETE_FIELDS, AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, \
+    autocomplete_index
+from video.api.exports import EXPORT_FORMATS, iter_file, iter_serialized
+from video.api.filtering import ARCHIVE_DATE_FIELD, filter_compiler, get_lookup_path
+from video.api.jobs import JOB_DONE, get_job, get_job_data, get_job_path, submit_export
+from video.api.pagination import KeysetPaginator
+from video.api.params import FILTER_PARAMS, FILTER_PARAMS_ETAG, PARAMS_META, is_date_param
+from video.api.serializers import PointWebcamSerializer, PointWebcamFilterTemplateSerializer, \
+    prefetch_live_stream_urls
+from video.mediaserver import MEDIASERVER_SITE, MediaServerError, archive_cache, archive_index, get_client, \
+    get_pool
 from video.models import Webcam, PointWebcamFilterTemplate
-from video.utils import SecureLink
+from video.monitor import collect, get_monitor_queryset, get_snapshot
+from video.utils import SecureLink, get_list_version, get_video_cache, is_video_cache_shared
 
-CHECK_TIMEOUT = 1
-ARCHIVE_MAX_DAYS = 90
-ARCHIVE_DATE_FIELD = 'archive_date'
+LIST_ETAG_PERIOD = 5*60
+LIST_CACHE_TIMEOUT = getattr(settings, 'VIDEO_LIST_CACHE_TIMEOUT', 0)
+ARCHIVE_SIGN_BUCKET = 5*60
+ARCHIVE_BATCH_MAX_ITEMS = 64
 ARCHIVE_HOURS = ['{:02d}:00'.format(h) for h in xrange(8, 21)]
 
+archive_signer = SecureLink(bucket=ARCHIVE_SIGN_BUCKET)
+
 
 class MediaServerAPIMixin(object):
-    api_url = 'http://{url}:{port}/api'.format(
-        url=getattr(settings, 'MEDIASERVER_URL', ''),
-        port=getattr(settings, 'MEDIASERVER_HTTP_PORT', ''),
-    )
 
     def format_rec_date(self, rec_date):
         if not rec_date:
@@ -43,72 +53,67 @@ class MediaServerAPIMixin(object):
             return timezone.datetime.strptime(rec_date, '%d.%m.%Y').date().isoformat()
 
     def get_archive_dates(self, point=None):
-        try:
-            resp = requests.get('{url}/archive_dates/{site}/'.format(
-                url=self.api_url,
-                site='kam',
-                )
-            )
-            if not resp.ok:
-                raise Exception(message='Mediaserver API archive_dates request exception')
-            return (
-                timezone.datetime.strptime(_date, '%d-%m-%Y').date()
-                for _date in resp.json()['result']
-            )
-        except Exception:
-            # Предполагаем, что есть архивы на любую дату
-            start = timezone.now()
-            return ((start - timezone.timedelta(days=x)).date() for x in xrange(0, ARCHIVE_MAX_DAYS))
+        return [
+            timezone.datetime.strptime(_date, '%Y-%m-%d').date()
+            for _date in archive_index.get_dates()
+        ]
 
     def get_archive_hours(self, webcam, rec_date):
         try:
             rec_date = self.format_rec_date(rec_date)
-            resp = requests.get(
-                '{url}/archive_hours/{site}/{webcam}/{rec_date}/'.format(
-                    url=self.api_url,
-                    site='kam',
+            return archive_cache.get_or_fetch(
+                'hours',
+                lambda: get_client().get('archive_hours/{site}/{webcam}/{rec_date}/'.format(
+                    site=MEDIASERVER_SITE,
                     webcam=webcam,
                     rec_date=rec_date,
-                )
-            )
-            if not resp.ok:
-                raise Exception(message='Mediaserver API archive_hours request exception')
-            return resp.json()['result']
-        except Exception, e:
-            return ()
-
-
-    def get_points_by_recdate(self, rec_date=None):
-        try:
-            rec_date = self.format_rec_date(rec_date)
-            resp = requests.get('{url}/points_by_date/{site}/{rec_date}/'.format(
-                url=self.api_url,
-                site='kam',
+                )),
+                camera=webcam,
                 rec_date=rec_date,
-                )
             )
-            if not resp.ok:
-                raise Exception(message='Mediaserver API points_by_date request exception')
-            return resp.json()['result']
-        except Exception, e:
+        except (MediaServerError, ValueError):
             return ()
 
+    def get_points_by_recdate(self, *rec_dates):
+        """
+        SPID точек с записями хотя бы за одну из дат (ДД.ММ.ГГГГ, по
+        умолчанию - сегодня) по локальному индексу архива.
+        """
+        return archive_index.get_points(*[
+            self.format_rec_date(rec_date) for rec_date in rec_dates or (None,)
+        ])
+
 
 class PointWebcamList(ListAPIView, MediaServerAPIMixin):
     serializer_class = PointWebcamSerializer
     paginate_by = 100
     paginate_by_param = 'per_page'
     filter_backends = (filters.DjangoFilterBackend, )
+    # Колонки, которые читает PointWebcamSerializer; ответственный
+    # загружается целиком ради Profile.get_full_name()
+    serializer_fields = (
+        'id', 'name', 'slug', 'online', 'ip', 'installed',
+        'point', 'point__id', 'point__name', 'point__spid', 'point__address',
+        'point__city', 'point__city__name',
+        'point__trade_network', 'point__trade_network__name',
+        'responsible',
+    )
+
+    def get_query_params(self):
+        return self.request.QUERY_PARAMS
 
     def get_ordering_params(self):
         """
         .../?sort_by=["field1.subfield","-field2"]
 
+        Поля задаются как в фильтрах: ``point.trade_network`` сортируется по
+        названию сети.
         """
         try:
-            sort_by = self.request.QUERY_PARAMS.get('sort_by')
+            sort_by = self.get_query_params().get('sort_by')
             return [
-                it.strip().replace('.', '__') for it in ast.literal_eval(sort_by)
+                '{}{}'.format('-' if it.strip().startswith('-') else '', get_lookup_path(it.strip().lstrip('-')))
+                for it in ast.literal_eval(sort_by)
             ]
         except ValueError:
             return None
@@ -118,66 +123,95 @@ class PointWebcamList(ListAPIView, MediaServerAPIMixin):
         .../?filters={"field":[["gt","field_value"]]}
 
         """
-        filters, exclude = Q(), []
-        try:
-            fq = self.request.QUERY_PARAMS.get('filters')
-            print('fq', fq)
-            print(self.request.QUERY_PARAMS)
-            fd = json.loads(fq)
-            for fld, value_list in fd.items():
-                q = Q()
-                for value_part in value_list:
-                    oper, val = value_part
-
-                    if fld == ARCHIVE_DATE_FIELD:
-                        point_spid_list = self.get_points_by_recdate(rec_date=val)
-                        print('point_spid_list:', point_spid_list)
-                        q |= Q(point__spid__in=point_spid_list)
-                        continue
-
-                    if PointWebcamFilterParamList.is_date_param(fld):
-                        val = datetime.strptime(val, '%d.%m.%Y').date()
-
-                    if fld == 'online':
-                        val = Webcam.WEBCAM_STATUS_CHOICES.get_value_by_display_name(val)
-
-                    fld = fld.strip().replace('.', '__')
-
-                    if oper == '=':
-                        if fld == 'responsible__last_name':
-                            q |= Q(
-                                responsible__last_name=val.split()[0],
-                                responsible__first_name=val.split()[1]
-                            )
-                        else:
-                            q |= Q(**{fld: val})
-                    elif oper == '!=':
-                        if fld == 'responsible__last_name':
-                            exclude.append({
-                                'responsible__last_name': val.split()[0],
-                                'responsible__first_name': val.split()[1]
-                            })
-                        else:
-                            exclude.append({fld: val})
-                    else:
-                        q |= Q(**{'%s__%s' % (fld, oper): val})
-                filters &= q
+        compiled = filter_compiler.compile(self.get_query_params().get('filters'))
+        archive_spids = None
+        if compiled.archive_dates:
+            archive_spids = self.get_points_by_recdate(*compiled.archive_dates)
+        return compiled.get_q(archive_spids)
+
+    def get_etag(self):
+        """
+        ETag страницы: версия данных списка, канонические параметры запроса
+        и номер периода ``LIST_ETAG_PERIOD`` (в ответе есть подписанные
+        ссылки с ограниченным сроком действия).
+        """
+        params = sorted(
+            (key, sorted(values)) for key, values in self.request.QUERY_PARAMS.lists()
+        )
+        return md5(json.dumps([
+            get_list_version(),
+            int(time() // LIST_ETAG_PERIOD),
+            params,
+        ])).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Поддерживает условный GET: при совпадении If-None-Match отвечает 304
+        без построения страницы. При ``VIDEO_LIST_CACHE_TIMEOUT`` страницы
+        кешируются на сервере по ETag.
+
+        Версию данных меняют и другие процессы (``video_monitor`` пишет
+        статусы), поэтому без общего кеша ``VIDEO_CACHE_ALIAS`` ETag не
+        выдается и страница всегда строится заново.
+        """
+        if not is_video_cache_shared():
+            return self.get_list_response(request, *args, **kwargs)
+        etag = self.get_etag()
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = 'video:list:page:{}'.format(etag)
+            data = get_video_cache().get(cache_key) if LIST_CACHE_TIMEOUT else None
+            if data is not None:
+                response = Response(data)
             else:
-                pass
-            return filters, exclude
-        except (IndexError, KeyError):
-            raise Http404
-        except (ValueError, TypeError):
-            pass
-        return Q(), []
+                response = self.get_list_response(request, *args, **kwargs)
+                if LIST_CACHE_TIMEOUT and response.status_code == status.HTTP_200_OK:
+                    get_video_cache().set(cache_key, response.data, LIST_CACHE_TIMEOUT)
+        response['ETag'] = quote_etag(etag)
+        return response
+
+    def get_list_response(self, request, *args, **kwargs):
+        """
+        Постраничный вывод по курсору включается параметром ``cursor``
+        (пустым для первой страницы): .../?cursor=&sort_by=["point.name"]
+        Общее количество считается только при ``?count=1``.
+        """
+        if 'cursor' not in request.QUERY_PARAMS:
+            return super(PointWebcamList, self).list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = self.get_ordering_params() or list(Webcam._meta.ordering)
+        if 'id' not in ordering and '-id' not in ordering:
+            ordering.append('id')
+        paginator = KeysetPaginator(ordering, self.get_paginate_by(), model=Webcam)
+        items, next_cursor, previous_cursor = paginator.paginate(
+            queryset, request.QUERY_PARAMS.get('cursor')
+        )
+        prefetch_live_stream_urls(items)
+        url = request.build_absolute_uri()
+        data = OrderedDict((
+            ('next', replace_query_param(url, 'cursor', next_cursor) if next_cursor else None),
+            ('previous', replace_query_param(url, 'cursor', previous_cursor) if previous_cursor else None),
+            ('results', self.get_serializer(items, many=True).data),
+        ))
+        if request.QUERY_PARAMS.get('count'):
+            data['count'] = queryset.count()
+        return Response(data)
+
+    def paginate_queryset(self, queryset, page_size=None):
+        page = super(PointWebcamList, self).paginate_queryset(queryset, page_size)
+        if page is not None:
+            page.object_list = prefetch_live_stream_urls(page.object_list)
+        return page
 
     def get_queryset(self):
-        queryset = Webcam.objects.all()
-        filter_args, exclude_args = self.get_filter_params()
+        queryset = Webcam.objects.select_related(
+            'point', 'point__city', 'point__trade_network', 'responsible',
+        ).only(*self.serializer_fields)
+        filter_args = self.get_filter_params()
         if filter_args:
             queryset = queryset.filter(filter_args)
-        for arg in exclude_args:
-            queryset = queryset.exclude(**arg)
 
         order_args = self.get_ordering_params()
         if order_args:
@@ -185,66 +219,41 @@ class PointWebcamList(ListAPIView, MediaServerAPIMixin):
         return queryset
 
 
-class ChainedAttrDict(object):
-    def __init__(self, _dict):
-        self.dict = _dict
+class PointWebcamListXlsView(PointWebcamList):
+    """
+    Выгрузка списка камер с теми же параметрами filters, sort_by и
+    visible_cols, что и у списка.
+
+    .../?format=[xlsx|csv|ndjson]
 
-    def __getitem__(self, item_chain):
-        val = self.dict
-        for key in item_chain.split('.'):
-            val = val[key]
-        return val
+    """
+    default_export_format = 'xlsx'
 
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= здесь задает формат файла, а не рендерер API
+        return super(PointWebcamListXlsView, self).perform_content_negotiation(request, force=True)
+
+    def get_export_class(self):
+        export_format = self.get_query_params().get('format') or self.default_export_format
+        try:
+            return EXPORT_FORMATS[export_format]
+        except KeyError:
+            raise Http404
 
-class PointWebcamListXlsView(PointWebcamList):
     def get(self, request, *args, **kwargs):
-        xls_helper = self.get_xls_helper()
-        fd, fn = tempfile.mkstemp()
-        os.close(fd)
-        xls_helper.book.save(fn)
-        fh = open(fn, 'rb')
-        resp = fh.read()
-        fh.close()
-        response = HttpResponse(resp, content_type='application/vnd.ms-excel')
-        response['Content-Disposition'] = 'attachment; filename=Камеры_видеоконтроля.xlsx'
+        export_class = self.get_export_class()
+        export = export_class(self.get_visible_cols(), iter_serialized(self.get_queryset()))
+        response = StreamingHttpResponse(export.stream(), content_type=export.content_type)
+        response['Content-Disposition'] = 'attachment; filename=Камеры_видеоконтроля.{}'.format(
+            export.extension
+        )
         return response
 
-    def get_xls_helper(self):
-        xls_helper = NewExcelHelper()
-        xls_helper = self.xls_write_data(xls_helper)
-        return xls_helper
-
-    def xls_write_data(self, xls_helper):
-        obj_list = PointWebcamSerializer(self.get_queryset(), many=True).data
-        visible_cols = self.get_visible_cols()
-        xls_helper.add_page(u'Камеры видеоконтроля')
-        
-        row_num = col_num = 0
-        for v_col in visible_cols:
-            field_name = v_col['name']
-            xls_helper.write_cell(field_name, row_num, col_num)
-            col_num += 1
-
-        row_num = 1
-        for obj in obj_list:
-            col_num = 0
-            for v_col in visible_cols:
-                data = ChainedAttrDict(obj)
-                xls_helper.write_cell(
-                    data[v_col['field']],
-                    row_num,
-                    col_num,
-                    vertical_alignment="top")
-                col_num += 1
-            row_num += 1
-
-        return xls_helper
-
     def get_visible_cols(self):
         param_meta = PointWebcamFilterParamList.get_params_meta()
         try:
             _cols = json.loads(
-                self.request.QUERY_PARAMS.get('visible_cols')
+                self.get_query_params().get('visible_cols')
             )
             if isinstance(_cols, list):
                 return [
@@ -258,6 +267,64 @@ class PointWebcamListXlsView(PointWebcamList):
         ]
 
 
+class PointWebcamExportJobList(PointWebcamListXlsView):
+    """
+    Фоновая выгрузка списка камер. POST принимает те же параметры
+    filters, sort_by, visible_cols и format, что и выгрузка, и возвращает
+    задачу; ход выполнения - в .../export-jobs/[id]/, файл - в
+    .../export-jobs/[id]/download/.
+    """
+    http_method_names = ['post', 'options']
+    job_params = ('filters', 'sort_by', 'visible_cols', 'format')
+
+    def get_query_params(self):
+        params = {}
+        for name in self.job_params:
+            value = self.request.DATA.get(name)
+            if value is not None and not isinstance(value, basestring):
+                value = json.dumps(value)
+            params[name] = value
+        return params
+
+    def post(self, request, *args, **kwargs):
+        job = submit_export(
+            self.get_queryset(),
+            self.get_visible_cols(),
+            self.get_export_class(),
+            self.get_query_params(),
+            request.user.id,
+        )
+        return Response(get_job_data(job), status=status.HTTP_202_ACCEPTED)
+
+
+class PointWebcamExportJobMixin(object):
+    def get_object(self, job_id):
+        job = get_job(job_id)
+        if job is None or job['user_id'] != self.request.user.id:
+            raise Http404
+        return job
+
+
+class PointWebcamExportJobDetail(PointWebcamExportJobMixin, APIView):
+    def get(self, request, job_id):
+        return Response(get_job_data(self.get_object(job_id)))
+
+
+class PointWebcamExportJobDownload(PointWebcamExportJobMixin, APIView):
+    def get(self, request, job_id):
+        job = self.get_object(job_id)
+        path = get_job_path(job)
+        if job['status'] != JOB_DONE or not os.path.exists(path):
+            raise Http404
+        response = StreamingHttpResponse(
+            iter_file(open(path, 'rb')),
+            content_type=EXPORT_FORMATS[job['format']].content_type
+        )
+        response['Content-Length'] = str(os.path.getsize(path))
+        response['Content-Disposition'] = 'attachment; filename=Камеры_видеоконтроля.{}'.format(job['format'])
+        return response
+
+
 class PointWebcamFilterParamList(APIView):
     """
 ##Описание параметров для списка веб-камер
@@ -284,158 +351,24 @@ class PointWebcamFilterParamList(APIView):
     """
 
     def get(self, request):
-        result = self.get_pointwebcam_filter_params()
-        return Response(result)
+        if FILTER_PARAMS_ETAG in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(self.get_pointwebcam_filter_params())
+        response['ETag'] = quote_etag(FILTER_PARAMS_ETAG)
+        return response
 
     @staticmethod
     def get_pointwebcam_filter_params():
-        less_params = [
-            {"query_name": "=", "name": "="},
-            {"query_name": "!=", "name": "!="}
-        ]
-        more_params = [
-            {"query_name": "=", "name": "="},
-            {"query_name": "!=", "name": "!="},
-            {"query_name": "gt", "name": ">"},
-            {"query_name": "gte", "name": ">="},
-            {"query_name": "lt", "name": "<"},
-            {"query_name": "lte", "name": "<="}
-        ]
-        return [
-            {
-                "field": "point.name",
-                "is_visible_in_list": True,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "Точка продаж",
-            },
-            {
-                "field": "point.spid",
-                "is_visible_in_list": True,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "ID точки продаж",
-            },
-            {
-                "field": "point.trade_network",
-                "is_visible_in_list": True,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "Торговая сеть",
-            },
-            {
-                "field": "point.city.name",
-                "is_visible_in_list": True,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "Город",
-            },
-            {
-                "field": "point.address",
-                "is_visible_in_list": True,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "Адрес",
-            },
-            {
-                "field": "id",
-                "is_visible_in_list": False,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "ID камеры",
-            },
-            {
-                "field": "name",
-                "is_visible_in_list": True,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "Название камеры",
-            },
-            {
-                "field": "slug",
-                "is_visible_in_list": False,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "Slug",
-            },
-            {
-                "field": "responsible.last_name",
-                "is_visible_in_list": True,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "Ответственный",
-            },
-            {
-                "field": "online",
-                "is_visible_in_list": True,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "Статус",
-            },
-            {
-                "field": "ip",
-                "is_visible_in_list": True,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": less_params,
-                "field_name": "IP-адрес камеры",
-            },
-            {
-                "field": "installed",
-                "is_visible_in_list": True,
-                "type": "date",
-                "is_group": False,
-                "aggregation_params": None,
-                "filter_params": more_params,
-                "field_name": "Дата подключения",
-            },
-            {
-                "field": "livestream_url",
-                "is_visible_in_list": False,
-                "type": "str",
-                "is_group": False,
-                "aggregation_params": None,
-                # "filter_params": less_params,
-                "field_name": "URL трансляции",
-            },
-        ]
+        return FILTER_PARAMS
 
     @classmethod
     def get_params_meta(cls):
-        result = OrderedDict()
-        for fp in cls.get_pointwebcam_filter_params():
-            result[fp['field']] = {
-                'type': fp['type'],
-                'name': fp['field_name'],
-                'visible': fp['is_visible_in_list'],
-            }
-        return result
+        return PARAMS_META
 
     @classmethod
     def is_date_param(cls, param):
-        p_meta = cls.get_params_meta()
-        return param in p_meta and p_meta.get(param)['type'] == 'date'
+        return is_date_param(param)
 
 
 class PointWebcamFieldAutocomplete(APIView, MediaServerAPIMixin):
@@ -452,26 +385,19 @@ class PointWebcamFieldAutocomplete(APIView, MediaServerAPIMixin):
         except (ValueError, AttributeError):
             pass
 
+    def get_limit(self):
+        try:
+            limit = int(self.request.QUERY_PARAMS.get('limit', AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = AUTOCOMPLETE_LIMIT
+        return min(max(limit, 1), AUTOCOMPLETE_MAX_LIMIT)
+
     def get(self, request):
         field, q = self.get_field_param()
         if field:
             if field == ARCHIVE_DATE_FIELD:
                 return Response(self.get_archive_dates())
 
-            field = field.replace('.', '__')
-            query = {'%s__icontains' % field: q}
-            qs = Webcam.objects.filter(**query)\
-                .select_related(
-                    'point',
-                    'point_city',
-                    'responsible'
-                ).order_by(field)
-
-            if field == 'responsible__last_name':
-                return Response((
-                    wc.responsible.get_full_name()
-                    for wc in qs.distinct('responsible__last_name', 'responsible__first_name')
-                ))
             if field == 'online':
                 return Response(
                     sorted(
@@ -480,9 +406,8 @@ class PointWebcamFieldAutocomplete(APIView, MediaServerAPIMixin):
                         ) if q in choice
                     )
                 )
-            return Response(
-                qs.distinct(field).values_list(field, flat=True)
-            )
+            if field in AUTOCOMPLETE_FIELDS:
+                return Response(autocomplete_index.search(field, q, self.get_limit()))
         return Response()
 
 
@@ -503,88 +428,144 @@ class PointWebcamArchiveList(APIView, MediaServerAPIMixin):
         except Webcam.DoesNotExist:
             raise Http404
 
+    # (ключ, serve, type, ext) ссылок на каждый час архива
+    archive_links = (
+        ('img', 'media', 'img', 'jpg'),
+        ('mp4', 'media', 'rec', 'mp4'),
+        ('download', 'download', 'rec', 'mp4'),
+    )
+
+    def get_hour_entries(self, spid, slug, dt, actual_hours):
+        url_args = {
+            'url': getattr(settings, 'MEDIASERVER_URL', ''),
+            'port': getattr(settings, 'MEDIASERVER_HTTP_PORT', ''),
+            'serve': '{serve}',
+            'type': '{type}',
+            'point': spid,
+            'cam': slug,
+            'date': dt,
+            'hour': '{hour}',
+            'ext': '{ext}',
+        }
+        urlpath = 'http://{url}:{port:d}/{serve}/{type}/kam_sp{point}_{cam}_' \
+                  '{date:%d-%m-%Y}_{hour}.{ext}'.format(**url_args)
+        hours = [hr for hr in ARCHIVE_HOURS if hr in actual_hours]
+        urls = iter(archive_signer.sign_many(
+            urlpath.format(serve=serve, type=_type, hour=hr, ext=ext)
+            for hr in hours
+            for key, serve, _type, ext in self.archive_links
+        ))
+        return [
+            dict(
+                [('label', '{}'.format(hr))] +
+                [(key, next(urls)) for key, serve, _type, ext in self.archive_links]
+            )
+            for hr in hours
+        ]
+
     def get(self, request, spid, slug):
         _date = self.request.QUERY_PARAMS.get('date')
         if _date:
             try:
                 self.get_object(spid, slug)
                 dt = timezone.datetime.strptime(_date, '%d.%m.%Y').date()
-                url_args = {
-                    'url': getattr(settings, 'MEDIASERVER_URL', ''),
-                    'port': getattr(settings, 'MEDIASERVER_HTTP_PORT', ''),
-                    'serve': '{serve}',
-                    'type': '{type}',
-                    'point': spid,
-                    'cam': slug,
-                    'date': dt,
-                    'hour': '{hour}',
-                    'ext': '{ext}',
-                }
-                urlpath = 'http://{url}:{port:d}/{serve}/{type}/kam_sp{point}_{cam}_' \
-                          '{date:%d-%m-%Y}_{hour}.{ext}'.format(**url_args)
                 actual_hours = self.get_archive_hours(webcam=slug, rec_date=_date)
-                signer = SecureLink()
-                return Response(
-                    [
-                        {
-                            'label': '{}'.format(hr),
-                            'img': signer.sign(
-                                urlpath.format(serve='media', type='img', hour=hr, ext='jpg')
-                            ),
-                            'mp4': signer.sign(
-                                urlpath.format(serve='media', type='rec', hour=hr, ext='mp4')
-                            ),
-                            'download': signer.sign(
-                                urlpath.format(serve='download', type='rec', hour=hr, ext='mp4')
-                            ),
-                        }
-                        for hr in ARCHIVE_HOURS if hr in actual_hours
-                    ]
-                )
+                return Response(self.get_hour_entries(spid, slug, dt, actual_hours))
             except ValueError:
                 pass
         return Response()
 
 
-class PointWebcamMonitor(APIView):
-    @staticmethod
-    def check_update_status(webcams):
-        for cam in webcams:
-            try:
-                if cam.ip == Webcam.DEFAULT_IP:
-                    cam.online = Webcam.WEBCAM_STATUS_CHOICES.off
-                    return
+class PointWebcamArchiveBatchList(PointWebcamArchiveList):
+    """
+    Списки URL видео-архивов сразу для нескольких камер и дат. Часы архива
+    запрашиваются у медиасервера параллельно, камеры ищутся одним запросом.
 
-                resp = requests.get(
-                    'http://{ip}:{port}'.format(ip=cam.ip, port=cam.port),
-                    timeout=CHECK_TIMEOUT
-                )
-                status_new = Webcam.WEBCAM_STATUS_CHOICES.on if resp.ok else Webcam.WEBCAM_STATUS_CHOICES.error
-                if cam.online != status_new:
-                    cam.online = status_new
-            except RequestException:
-                cam.online = Webcam.WEBCAM_STATUS_CHOICES.error
-            finally:
-                cam.save(update_fields=('online',))
-                yield (cam, Webcam.WEBCAM_STATUS_CHOICES.get_attr_by_value(cam.online))
+    POST .../api/video/pointwebcamlist/archive-list/batch/
 
-    def get(self, request):
-        return Response(
-            {
-                cam.id: {
-                    'status': online,
-                    'status_name': cam.get_online_display(),
-                    'ip': cam.ip
-                }
-                for cam, online in self.check_update_status(self.get_queryset())
-            }
+    {"items": [["100", "kamera-2", "16.01.2015"], ...]}
+
+    Ответ - список в том же порядке: {"spid", "slug", "date", "hours"}, для
+    неизвестных камер и некорректных дат вместо "hours" - "error".
+    """
+    http_method_names = ['post', 'options']
+    max_items = ARCHIVE_BATCH_MAX_ITEMS
+
+    def get_items(self):
+        items = self.request.DATA.get('items')
+        if not isinstance(items, list) or len(items) > self.max_items:
+            raise ParseError('items: ожидается список не более чем из {} элементов'.format(self.max_items))
+        try:
+            return [(unicode(spid), unicode(slug), unicode(_date)) for spid, slug, _date in items]
+        except (TypeError, ValueError):
+            raise ParseError('items: ожидаются тройки [SPID точки, slug камеры, дата]')
+
+    def get_existing(self, items):
+        q = Q()
+        for spid, slug, _date in items:
+            q |= Q(point__spid=spid, slug=slug)
+        if not items:
+            return set()
+        return set(
+            (unicode(spid), slug) for spid, slug in Webcam.objects.filter(q).values_list('point__spid', 'slug')
         )
 
+    def post(self, request):
+        items = self.get_items()
+        existing = self.get_existing(items)
+        hour_requests = sorted(set(
+            (slug, _date) for spid, slug, _date in items if (spid, slug) in existing
+        ))
+        hours = {}
+        if hour_requests:
+            hours = dict(zip(hour_requests, get_pool().map(
+                lambda args: self.get_archive_hours(webcam=args[0], rec_date=args[1]), hour_requests
+            )))
+
+        result = []
+        for spid, slug, _date in items:
+            entry = {'spid': spid, 'slug': slug, 'date': _date}
+            if (spid, slug) not in existing:
+                entry['error'] = 'not found'
+            else:
+                try:
+                    dt = timezone.datetime.strptime(_date, '%d.%m.%Y').date()
+                except ValueError:
+                    entry['error'] = 'invalid date'
+                else:
+                    entry['hours'] = self.get_hour_entries(spid, slug, dt, hours[(slug, _date)])
+            result.append(entry)
+        return Response(result)
+
+
+class PointWebcamMonitor(APIView):
+    """
+    Статусы камер из последнего снимка фонового опроса (команда
+    ``video_monitor``). Возраст снимка в секундах передается в заголовке
+    ``Age``, число записанных в БД изменений статуса - в ``X-Rows-Written``,
+    число проверенных в цикле камер - в ``X-Probed``. С параметром
+    ``?refresh=1`` заново опрашиваются все камеры, без учета расписания.
+    Снимок передается через общий кеш ``VIDEO_CACHE_ALIAS``; если он не
+    настроен, камеры опрашиваются при каждом запросе, а снимок и события
+    не публикуются.
+    """
+
+    def get(self, request):
+        shared = is_video_cache_shared()
+        snapshot = None
+        if shared and not request.QUERY_PARAMS.get('refresh'):
+            snapshot = get_snapshot()
+        if snapshot is None:
+            snapshot = collect(self.get_queryset(), publish=shared)
+        response = Response(snapshot['result'])
+        response['Age'] = str(max(int(time() - snapshot['timestamp']), 0))
+        response['X-Rows-Written'] = str(snapshot.get('rows_written', 0))
+        if 'stats' in snapshot:
+            response['X-Probed'] = str(snapshot['stats']['probed'])
+        return response
+
     def get_queryset(self):
-        return Webcam.objects.exclude(
-            ip=Webcam.DEFAULT_IP,
-            online=Webcam.WEBCAM_STATUS_CHOICES.off
-        )
+        return get_monitor_queryset()
 
 
 class PoinWebcamFilterTemplateViewSet(ModelViewSet):
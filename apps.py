@@ -10,4 +10,5 @@ class RptAppConfig(AppConfig):
     verbose_name = 'Видеоконтроль'
 
     def ready(self):
-        add_loggers('video')
\ No newline at end of file
+        add_loggers('video')
+        from video import signals  # noqa
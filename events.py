@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from time import time
+
+from django.conf import settings
+
+from video.utils import get_shared_video_cache
+
+EVENTS_TTL = getattr(settings, 'VIDEO_EVENTS_TTL', 60*60)
+EVENTS_MAX_REPLAY = 1000
+EVENTS_WRITE_GRACE = 10
+EVENTS_SEQ_CACHE_KEY = 'video:events:seq'
+
+
+def event_key(seq):
+    return 'video:events:{}'.format(seq)
+
+
+class StatusEventLog(object):
+    """
+    Журнал изменений статусов камер в кеше видеоконтроля. Каждое событие -
+    изменения одного цикла опроса ``[{"id", "old", "new"}, ...]`` под
+    возрастающим номером. События хранятся ``ttl`` секунд: клиент,
+    отключившийся на меньшее время, дочитывает пропущенное по номеру
+    последнего полученного события.
+
+    Кеш ``VIDEO_CACHE_ALIAS`` должен быть общим для процесса опроса и
+    процесса, раздающего события.
+    """
+
+    def __init__(self, ttl=EVENTS_TTL):
+        self.ttl = ttl
+
+    def get_last_seq(self):
+        cache = get_shared_video_cache()
+        seq = cache.get(EVENTS_SEQ_CACHE_KEY)
+        if seq is None:
+            # Начальный номер от времени, чтобы после очистки кеша номера
+            # не совпали с выданными ранее
+            cache.add(EVENTS_SEQ_CACHE_KEY, int(time() * 1000), None)
+            seq = cache.get(EVENTS_SEQ_CACHE_KEY)
+        return seq
+
+    def publish(self, changes):
+        """
+        Добавляет событие из списка изменений и возвращает его.
+        """
+        if not changes:
+            return None
+        cache = get_shared_video_cache()
+        self.get_last_seq()
+        seq = cache.incr(EVENTS_SEQ_CACHE_KEY)
+        event = {
+            'seq': seq,
+            'timestamp': time(),
+            'changes': changes,
+        }
+        cache.set(event_key(seq), event, self.ttl)
+        return event
+
+    def read_since(self, seq, last_seq=None):
+        """
+        События с номерами больше ``seq`` по порядку. Если часть из них
+        уже вытеснена из кеша, их больше ``EVENTS_MAX_REPLAY`` или номер
+        из будущего (кеш очищался), возвращает ``None``: клиенту нужно перечитать состояние целиком.
+        """
+        if last_seq is None:
+            last_seq = self.get_last_seq()
+        if seq > last_seq or last_seq - seq > EVENTS_MAX_REPLAY:
+            return None
+        if seq == last_seq:
+            return []
+        keys = [event_key(n) for n in xrange(seq + 1, last_seq + 1)]
+        found = get_shared_video_cache().get_many(keys)
+        events = []
+        for key in keys:
+            if key not in found:
+                break
+            events.append(found[key])
+        if len(events) < len(keys):
+            # Номер выдан, но событие еще не записано (publish между incr и
+            # set) - отдаем события до пропуска, остальные на следующем
+            # опросе. Пропуск перед давно записанными событиями означает,
+            # что событие вытеснено из кеша.
+            later = [found[key] for key in keys[len(events):] if key in found]
+            if later and time() - later[0]['timestamp'] > EVENTS_WRITE_GRACE:
+                return None
+        return events
+
+
+status_events = StatusEventLog()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from video.mediaserver import archive_cache
+from video.utils import is_video_cache_shared
+
+
+class Command(BaseCommand):
+    help = (
+        'Сбрасывает кеш часов записи архива медиасервера: для камеры за дату '
+        '(--camera и --date) или целиком (--all)'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--camera', dest='camera', default=None,
+            help='Slug камеры'
+        ),
+        make_option(
+            '--date', dest='date', default=None,
+            help='Дата записи, ГГГГ-ММ-ДД'
+        ),
+        make_option(
+            '--all', action='store_true', dest='all', default=False,
+            help='Сбросить весь кеш архива'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        camera, rec_date = options['camera'], options['date']
+        if options['all'] == bool(camera or rec_date) or bool(camera) != bool(rec_date):
+            raise CommandError('Укажите --camera и --date или --all')
+        if not is_video_cache_shared():
+            # Локальный кеш этой команды не виден процессам приложения
+            raise CommandError('VIDEO_CACHE_ALIAS не задает общий кеш, сбрасывать нечего')
+        if rec_date:
+            try:
+                rec_date = timezone.datetime.strptime(rec_date, '%Y-%m-%d').date().isoformat()
+            except ValueError:
+                raise CommandError('Неверная дата: {}'.format(rec_date))
+        archive_cache.invalidate(camera, rec_date)
+        if int(options['verbosity']) > 1:
+            self.stdout.write('Кеш архива сброшен')
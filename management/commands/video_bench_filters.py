@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from datetime import datetime
+import json
+from optparse import make_option
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from video.api.filtering import FilterCompiler
+from video.models import Webcam
+
+# Типичные фильтры дашборда: статус, даты, ответственный и исключения
+SAMPLE_FILTERS = (
+    {'online': [['=', 'работает']]},
+    {'installed': [['gte', '01.01.2015'], ['lt', '01.06.2015']], 'point.city.name': [['=', 'Москва']]},
+    {'responsible.last_name': [['=', 'Иванов Иван']], 'ip': [['!=', '10.0.0.1'], ['!=', '10.0.0.2']]},
+    {'name': [['=', 'Касса']], 'point.name': [['=', 'Магазин'], ['=', 'Склад']], 'online': [['!=', 'не подключена']]},
+)
+
+
+def legacy_filter_queryset(queryset, raw):
+    """
+    Разбор filters в том виде, в каком он был в PointWebcamList до
+    FilterCompiler: Q собирается заново на каждый запрос, каждое ``!=``
+    добавляет отдельный exclude().
+    """
+    filters, exclude = Q(), []
+    for fld, value_list in json.loads(raw).items():
+        q = Q()
+        for oper, val in value_list:
+            if fld in ('installed', 'created'):
+                val = datetime.strptime(val, '%d.%m.%Y').date()
+            if fld == 'online':
+                val = Webcam.WEBCAM_STATUS_CHOICES.get_value_by_display_name(val)
+            fld = fld.strip().replace('.', '__')
+            if fld == 'responsible__last_name':
+                lookup = {'responsible__last_name': val.split()[0], 'responsible__first_name': val.split()[1]}
+            elif oper in ('=', '!='):
+                lookup = {fld: val}
+            else:
+                lookup = {'{}__{}'.format(fld, oper): val}
+            if oper == '!=':
+                exclude.append(lookup)
+            else:
+                q |= Q(**lookup)
+        filters &= q
+    queryset = queryset.filter(filters)
+    for lookup in exclude:
+        queryset = queryset.exclude(**lookup)
+    return queryset
+
+
+def compiled_filter_queryset(compiler, queryset, raw):
+    return queryset.filter(compiler.compile(raw).get_q())
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время построения запроса списка камер по filters: '
+        'прежний разбор и FilterCompiler (без обращения к БД)'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--number', type='int', dest='number', default=2000,
+            help='Число повторов для каждого набора фильтров'
+        ),
+    )
+
+    def measure(self, build, number):
+        queryset = Webcam.objects.all()
+        started = default_timer()
+        for _ in xrange(number):
+            for raw in self.samples:
+                # SQL компилируется, чтобы учесть и стоимость лишних exclude()
+                build(queryset, raw).query.get_compiler(using=queryset.db).as_sql()
+        return default_timer() - started
+
+    def handle(self, *args, **options):
+        number = options['number']
+        self.samples = [json.dumps(sample) for sample in SAMPLE_FILTERS]
+        compiler = FilterCompiler()
+        total = number * len(self.samples)
+        results = (
+            ('legacy', self.measure(legacy_filter_queryset, number)),
+            ('compiled', self.measure(lambda qs, raw: compiled_filter_queryset(compiler, qs, raw), number)),
+        )
+        for name, elapsed in results:
+            self.stdout.write('{name:<10} {rate:>10.0f} запросов/с, {per:.1f} мкс на запрос'.format(
+                name=name, rate=total / elapsed, per=elapsed / total * 1e6,
+            ))
+        self.stdout.write('Ускорение: {:.2f}x'.format(results[0][1] / results[1][1]))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from base64 import urlsafe_b64encode
+from hashlib import md5
+from optparse import make_option
+from time import time
+from timeit import default_timer
+from urlparse import ParseResult, urlparse, urlunparse
+
+from django.core.management.base import BaseCommand
+from django.utils.http import urlencode
+
+from video.utils import SecureLink
+
+ARCHIVE_URL = 'http://mediaserver.local/kam/kam_sp{point}_kamera-{cam}/{date}/{hour:02d}/index.m3u8'
+
+
+def legacy_sign(signer, url):
+    """
+    Подпись ссылки в том виде, в каком она была в SecureLink до
+    sign_many(): срок действия считается дважды, запрос собирается
+    через urlparse и urlencode.
+    """
+    parsed = urlparse(url)
+    expiration = str(int(signer.timeout + time()))
+    string = signer.format.format(value=parsed.path, expiration=str(int(signer.timeout + time())),
+                                  secret=signer.secret)
+    sig = urlsafe_b64encode(md5(string).digest()).rstrip('=')
+    qs = parsed.query
+    if qs:
+        qs += '&'
+    qs += urlencode(dict(st=sig, e=expiration))
+    return urlunparse(ParseResult(parsed.scheme, parsed.netloc, parsed.path, parsed.params, qs, parsed.fragment))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость подписи ссылок архива: по одной (прежний путь), '
+        'пачкой через SecureLink.sign_many() и пачкой с окном bucket'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--pages', type='int', dest='pages', default=2000,
+            help='Число страниц архива (по 3 ссылки x 13 часов)'
+        ),
+    )
+
+    def get_pages(self, count):
+        # Страницы повторяются, как повторные запросы дашборда к тем же камерам
+        return [
+            [
+                ARCHIVE_URL.format(point=page % 50, cam=cam, date='2015-06-01', hour=hour)
+                for cam in xrange(3) for hour in xrange(8, 21)
+            ]
+            for page in xrange(count)
+        ]
+
+    def measure(self, sign_page, pages):
+        started = default_timer()
+        for urls in pages:
+            sign_page(urls)
+        return default_timer() - started
+
+    def handle(self, *args, **options):
+        pages = self.get_pages(options['pages'])
+        total = sum(len(urls) for urls in pages)
+        signer = SecureLink()
+        bucket_signer = SecureLink(bucket=5*60)
+        results = (
+            ('legacy', self.measure(lambda urls: [legacy_sign(signer, url) for url in urls], pages)),
+            ('sign_many', self.measure(signer.sign_many, pages)),
+            ('bucket', self.measure(bucket_signer.sign_many, pages)),
+        )
+        for name, elapsed in results:
+            self.stdout.write('{name:<10} {rate:>12.0f} подписей/с'.format(name=name, rate=total / elapsed))
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+import json
+import logging
+from optparse import make_option
+import socket
+from SocketServer import ThreadingMixIn
+from time import sleep, time
+from urlparse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from video.events import status_events
+
+EVENTS_PATH = '/events'
+EVENTS_POLL_INTERVAL = getattr(settings, 'VIDEO_EVENTS_POLL_INTERVAL', 1)
+EVENTS_HEARTBEAT = getattr(settings, 'VIDEO_EVENTS_HEARTBEAT', 15)
+EVENTS_RETRY = 3000
+# Origin, которому разрешено читать поток из браузера (CORS); по умолчанию
+# поток доступен только страницам того же origin
+EVENTS_ALLOWED_ORIGIN = getattr(settings, 'VIDEO_EVENTS_ALLOWED_ORIGIN', None)
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event_type, data, seq=None):
+    lines = []
+    if seq is not None:
+        lines.append('id: {}'.format(seq))
+    lines.append('event: {}'.format(event_type))
+    lines.append('data: {}'.format(json.dumps(data)))
+    return '\n'.join(lines) + '\n\n'
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StatusEventsHandler(BaseHTTPRequestHandler):
+    """
+    Поток Server-Sent Events с изменениями статусов камер.
+
+    Событие ``status`` - изменения одного цикла опроса, ``id`` события -
+    его номер в журнале. При переподключении номер последнего полученного
+    события передается в заголовке ``Last-Event-ID`` (браузер делает это
+    сам) или в параметре ``?last_event_id=``, и пропущенные события
+    досылаются. Если их уже нет в журнале, отправляется ``reset``: клиенту
+    нужно заново загрузить статусы через ``check-status``.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def get_last_event_id(self, query):
+        value = self.headers.get('Last-Event-ID') or query.get('last_event_id', [None])[0]
+        try:
+            return int(value) if value else None
+        except ValueError:
+            return None
+
+    def write(self, data):
+        self.wfile.write(data.encode('utf-8'))
+        self.wfile.flush()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip('/') != EVENTS_PATH:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        if EVENTS_ALLOWED_ORIGIN:
+            self.send_header('Access-Control-Allow-Origin', EVENTS_ALLOWED_ORIGIN)
+            self.send_header('Vary', 'Origin')
+        self.end_headers()
+        self.close_connection = 1
+
+        seq = self.get_last_event_id(parse_qs(url.query))
+        try:
+            self.write('retry: {}\n\n'.format(EVENTS_RETRY))
+            self.stream(seq)
+        except socket.error:
+            # Клиент отключился
+            pass
+
+    def stream(self, seq):
+        last_seq = status_events.get_last_seq()
+        if seq is None:
+            seq = last_seq
+        last_write = time()
+        while True:
+            events = status_events.read_since(seq, last_seq)
+            if events is None:
+                self.write(format_event('reset', {}, last_seq))
+                seq = last_seq
+                last_write = time()
+            for event in events or ():
+                self.write(format_event('status', event['changes'], event['seq']))
+                seq = event['seq']
+                last_write = time()
+            if time() - last_write >= EVENTS_HEARTBEAT:
+                self.write(': ping\n\n')
+                last_write = time()
+            sleep(EVENTS_POLL_INTERVAL)
+            last_seq = status_events.get_last_seq()
+
+    def log_message(self, format, *args):
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+
+class Command(BaseCommand):
+    help = (
+        'Раздает изменения статусов веб-камер потоком Server-Sent Events '
+        'по адресу {}'.format(EVENTS_PATH)
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--host', dest='host', default='127.0.0.1',
+            help='Адрес для входящих соединений'
+        ),
+        make_option(
+            '--port', type='int', dest='port', default=8090,
+            help='Порт для входящих соединений'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer((options['host'], options['port']), StatusEventsHandler)
+        self.stdout.write('Поток событий: http://{host}:{port}{path}'.format(
+            host=options['host'], port=options['port'], path=EVENTS_PATH,
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from optparse import make_option
+from time import sleep, time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from video.monitor import MONITOR_INTERVAL, MONITOR_TICK, ProbeScheduler, collect
+
+
+class Command(BaseCommand):
+    help = (
+        'Периодически опрашивает веб-камеры по расписанию (неработающие реже, '
+        'с часто меняющимся статусом чаще) и публикует снимок их статусов'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--interval', type='int', dest='interval', default=MONITOR_INTERVAL,
+            help='Интервал между проверками работающей камеры, сек.'
+        ),
+        make_option(
+            '--tick', type='int', dest='tick', default=MONITOR_TICK,
+            help='Интервал между циклами опроса, сек.'
+        ),
+        make_option(
+            '--once', action='store_true', dest='once', default=False,
+            help='Выполнить один опрос и завершиться'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        tick = options['tick']
+        # С --once расписание не нужно: опрашиваются все камеры
+        scheduler = None if options['once'] else ProbeScheduler(interval=options['interval'])
+        while True:
+            started = time()
+            close_old_connections()
+            snapshot = collect(scheduler=scheduler)
+            if int(options['verbosity']) > 1:
+                self.stdout.write(
+                    'Опрошено камер: {probed}, пропущено: {skipped} за {elapsed:.2f} с, '
+                    'обновлено статусов: {rows}'.format(
+                        probed=snapshot['stats']['probed'],
+                        skipped=snapshot['stats']['skipped'],
+                        elapsed=time() - started,
+                        rows=snapshot['rows_written'],
+                    )
+                )
+            if options['once']:
+                break
+            sleep(max(tick - (time() - started), 0))
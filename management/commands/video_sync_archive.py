@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from optparse import make_option
+from time import sleep, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from video.mediaserver import MediaServerError, archive_index
+
+SYNC_INTERVAL = 5*60
+
+
+class Command(BaseCommand):
+    help = 'Обновляет локальный индекс архива медиасервера (дата -> точки)'
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--interval', type='int', dest='interval', default=SYNC_INTERVAL,
+            help='Интервал между обновлениями, сек.'
+        ),
+        make_option(
+            '--once', action='store_true', dest='once', default=False,
+            help='Выполнить одно обновление и завершиться'
+        ),
+        make_option(
+            '--full', action='store_true', dest='full', default=False,
+            help='Перезагрузить точки за все даты'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        full = options['full']
+        while True:
+            started = time()
+            close_old_connections()
+            try:
+                updated = archive_index.sync(full=full)
+            except MediaServerError as e:
+                if options['once']:
+                    raise CommandError('Медиасервер недоступен: {}'.format(e))
+                self.stderr.write('Медиасервер недоступен: {}'.format(e))
+            else:
+                full = False
+                if int(options['verbosity']) > 1:
+                    self.stdout.write('Обновлено дат: {count} за {elapsed:.2f} с'.format(
+                        count=updated,
+                        elapsed=time() - started,
+                    ))
+            if options['once']:
+                break
+            sleep(max(interval - (time() - started), 0))
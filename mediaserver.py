@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+import logging
+from multiprocessing.pool import ThreadPool
+from threading import Lock
+from time import sleep, time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, RequestException, Timeout
+
+from video.models import ArchivePoint
+from video.utils import bump_list_version, get_video_cache
+
+MEDIASERVER_SITE = 'kam'
+MEDIASERVER_CONNECT_TIMEOUT = getattr(settings, 'MEDIASERVER_CONNECT_TIMEOUT', 1)
+MEDIASERVER_READ_TIMEOUT = getattr(settings, 'MEDIASERVER_READ_TIMEOUT', 5)
+MEDIASERVER_RETRIES = getattr(settings, 'MEDIASERVER_RETRIES', 2)
+MEDIASERVER_BACKOFF = getattr(settings, 'MEDIASERVER_BACKOFF', 0.2)
+MEDIASERVER_POOL_SIZE = getattr(settings, 'MEDIASERVER_POOL_SIZE', 16)
+MEDIASERVER_BREAKER_THRESHOLD = getattr(settings, 'MEDIASERVER_BREAKER_THRESHOLD', 5)
+MEDIASERVER_BREAKER_RESET = getattr(settings, 'MEDIASERVER_BREAKER_RESET', 30)
+MEDIASERVER_CACHE_TODAY_TTL = getattr(settings, 'MEDIASERVER_CACHE_TODAY_TTL', 60)
+MEDIASERVER_CACHE_PAST_TTL = getattr(settings, 'MEDIASERVER_CACHE_PAST_TTL', 7*24*60*60)
+MEDIASERVER_CACHE_STATS_INTERVAL = getattr(settings, 'MEDIASERVER_CACHE_STATS_INTERVAL', 5*60)
+
+logger = logging.getLogger(__name__)
+
+
+class MediaServerError(Exception):
+    pass
+
+
+class MediaServerUnavailable(MediaServerError):
+    """
+    Медиасервер временно считается недоступным (разомкнут предохранитель).
+    """
+
+
+class CircuitBreaker(object):
+    """
+    После ``threshold`` неудачных запросов подряд запросы к медиасерверу
+    не выполняются ``reset_timeout`` секунд, затем пропускается пробный.
+    """
+
+    def __init__(self, threshold=MEDIASERVER_BREAKER_THRESHOLD, reset_timeout=MEDIASERVER_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time() - self.opened_at >= self.reset_timeout:
+                # Пропускаем один пробный запрос, остальные ждут его результата
+                self.opened_at = time()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning('Mediaserver circuit breaker opened after %d failures', self.failures)
+                self.opened_at = time()
+
+
+class MediaServerClient(object):
+    """
+    Клиент HTTP API медиасервера с пулом keep-alive соединений, таймаутами,
+    повторами с экспоненциальной задержкой и предохранителем.
+    """
+
+    def __init__(self, base_url, connect_timeout=MEDIASERVER_CONNECT_TIMEOUT,
+                 read_timeout=MEDIASERVER_READ_TIMEOUT, retries=MEDIASERVER_RETRIES,
+                 backoff=MEDIASERVER_BACKOFF, pool_size=MEDIASERVER_POOL_SIZE, breaker=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, path):
+        """
+        GET ``{base_url}/{path}``, возвращает поле ``result`` ответа.
+        """
+        if not self.breaker.allow():
+            raise MediaServerUnavailable(path)
+        url = '{}/{}'.format(self.base_url, path.lstrip('/'))
+        for attempt in xrange(self.retries + 1):
+            if attempt:
+                sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                resp = self.session.get(url, timeout=self.timeout)
+            except (ConnectionError, Timeout) as e:
+                error = e
+                continue
+            except RequestException as e:
+                self.breaker.record_failure()
+                raise MediaServerError(e)
+            if resp.status_code >= 500:
+                error = MediaServerError('{} {}'.format(resp.status_code, url))
+                continue
+            if not resp.ok:
+                self.breaker.record_success()
+                raise MediaServerError('{} {}'.format(resp.status_code, url))
+            self.breaker.record_success()
+            try:
+                return resp.json()['result']
+            except (ValueError, KeyError, TypeError) as e:
+                raise MediaServerError(e)
+        self.breaker.record_failure()
+        raise MediaServerError(error)
+
+
+_client = None
+_client_lock = Lock()
+
+
+def get_client():
+    """
+    Общий на процесс экземпляр ``MediaServerClient``.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MediaServerClient(
+                    'http://{url}:{port}/api'.format(
+                        url=getattr(settings, 'MEDIASERVER_URL', ''),
+                        port=getattr(settings, 'MEDIASERVER_HTTP_PORT', ''),
+                    )
+                )
+    return _client
+
+
+_pool = None
+_pool_lock = Lock()
+
+
+def get_pool():
+    """
+    Общий на процесс пул потоков для параллельных запросов к медиасерверу
+    (по размеру пула соединений клиента).
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPool(MEDIASERVER_POOL_SIZE)
+    return _pool
+
+
+class ArchiveCache(object):
+    """
+    Кеш часов записи архива медиасервера по ключу (сайт, камера, дата).
+    Даты архива и точки за дату берутся из ``ArchiveIndex``.
+
+    Данные за сегодня хранятся ``today_ttl`` секунд, так как записи еще
+    дописываются, за прошедшие даты - ``past_ttl`` (``None`` - бессрочно).
+    Ошибки медиасервера не кешируются.
+
+    Счетчики попаданий и промахов процесса пишутся в лог не чаще чем раз в
+    ``stats_interval`` секунд; сбросить кеш можно командой
+    ``video_archive_cache``.
+    """
+    GENERATION_KEY = 'video:archive:generation'
+    _missing = object()
+
+    def __init__(self, site=MEDIASERVER_SITE, today_ttl=MEDIASERVER_CACHE_TODAY_TTL,
+                 past_ttl=MEDIASERVER_CACHE_PAST_TTL, stats_interval=MEDIASERVER_CACHE_STATS_INTERVAL):
+        self.site = site
+        self.today_ttl = today_ttl
+        self.past_ttl = past_ttl
+        self.stats_interval = stats_interval
+        self.hits = 0
+        self.misses = 0
+        self._stats_logged = time()
+        self._lock = Lock()
+
+    @property
+    def cache(self):
+        return get_video_cache()
+
+    def get_generation(self):
+        return self.cache.get(self.GENERATION_KEY, 0)
+
+    def make_key(self, kind, camera, rec_date):
+        return 'video:archive:{gen}:{kind}:{site}:{camera}:{date}'.format(
+            gen=self.get_generation(),
+            kind=kind,
+            site=self.site,
+            camera=camera,
+            date=rec_date,
+        )
+
+    def get_ttl(self, rec_date):
+        if rec_date >= timezone.now().date().isoformat():
+            return self.today_ttl
+        return self.past_ttl
+
+    def get_or_fetch(self, kind, fetch, camera, rec_date):
+        """
+        ``rec_date`` - дата в формате ISO.
+        """
+        key = self.make_key(kind, camera, rec_date)
+        value = self.cache.get(key, self._missing)
+        with self._lock:
+            if value is self._missing:
+                self.misses += 1
+            else:
+                self.hits += 1
+            log_stats = time() - self._stats_logged >= self.stats_interval
+            if log_stats:
+                self._stats_logged = time()
+        if log_stats:
+            stats = self.stats()
+            logger.info('Archive cache: %d hits, %d misses', stats['hits'], stats['misses'])
+        if value is self._missing:
+            value = fetch()
+            self.cache.set(key, value, self.get_ttl(rec_date))
+        return value
+
+    def invalidate(self, camera=None, rec_date=None):
+        """
+        Сбрасывает часы записи камеры ``camera`` за дату ``rec_date`` (ISO).
+        Если камера или дата не заданы, сбрасывается весь кеш архива.
+        """
+        if camera is None or rec_date is None:
+            try:
+                self.cache.incr(self.GENERATION_KEY)
+            except ValueError:
+                self.cache.set(self.GENERATION_KEY, 1, None)
+            return
+        self.cache.delete(self.make_key('hours', camera, rec_date))
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+archive_cache = ArchiveCache()
+
+
+class ArchiveIndex(object):
+    """
+    Локальный индекс архива медиасервера: дата -> SPID точек, по которым
+    есть записи. Заполняется командой ``video_sync_archive`` и хранится в
+    таблице ``ArchivePoint``, поэтому запросы к API не обращаются к
+    медиасерверу и видят один индекс во всех процессах.
+    """
+
+    def __init__(self, site=MEDIASERVER_SITE):
+        self.site = site
+
+    def get_queryset(self):
+        return ArchivePoint.objects.filter(site=self.site)
+
+    def get_dates(self):
+        """
+        Даты с записями (ISO), от новых к старым.
+        """
+        return [
+            rec_date.isoformat()
+            for rec_date in self.get_queryset().order_by('-rec_date').values_list('rec_date', flat=True).distinct()
+        ]
+
+    def get_points(self, *rec_dates):
+        """
+        Множество SPID точек с записями хотя бы за одну из дат ``rec_dates`` (ISO).
+        """
+        return set(self.get_queryset().filter(rec_date__in=rec_dates).values_list('spid', flat=True))
+
+    def get_synced(self):
+        """
+        Время последнего обновления индекса (``None``, если индекс пуст).
+        """
+        return self.get_queryset().aggregate(synced=Max('synced'))['synced']
+
+    def sync(self, client=None, full=False):
+        """
+        Загружает список дат и точки за даты, которых еще нет в индексе,
+        а также за сегодня и вчера (записи за них еще дописываются).
+        При ``full`` перезагружаются все даты. Данные медиасервера
+        загружаются целиком до записи, таблица обновляется в одной
+        транзакции. Если точки за какую-либо дату изменились, меняется
+        версия списка камер (фильтр по дате архива). Возвращает число
+        обновленных дат.
+        """
+        client = client or get_client()
+        dates = sorted((
+            timezone.datetime.strptime(_date, '%d-%m-%Y').date()
+            for _date in client.get('archive_dates/{site}/'.format(site=self.site))
+        ), reverse=True)
+        today = timezone.now().date()
+        recent = set((today, today - timezone.timedelta(days=1)))
+        if full:
+            stale = dates
+        else:
+            indexed = set(self.get_queryset().values_list('rec_date', flat=True).distinct())
+            stale = [d for d in dates if d in recent or d not in indexed]
+        points = []
+        for rec_date in stale:
+            points.extend(
+                ArchivePoint(site=self.site, rec_date=rec_date, spid=unicode(spid))
+                for spid in set(client.get('points_by_date/{site}/{rec_date}/'.format(
+                    site=self.site, rec_date=rec_date.isoformat(),
+                )))
+            )
+        replaced = self.get_queryset().filter(Q(rec_date__in=stale) | ~Q(rec_date__in=dates))
+        with transaction.atomic():
+            changed = (
+                set(replaced.values_list('rec_date', 'spid')) !=
+                set((point.rec_date, point.spid) for point in points)
+            )
+            replaced.delete()
+            ArchivePoint.objects.bulk_create(points, batch_size=1000)
+        if changed:
+            bump_list_version()
+        return len(stale)
+
+
+archive_index = ArchiveIndex()
@@ -1,16 +1,56 @@
 # -*- coding: utf-8 -*-
+from time import time
+
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 from .models import Config
+from .utils import get_video_cache, is_video_cache_shared
+
+CONFIG_CACHE_KEY = 'video:config'
+CONFIG_CACHE_TTL = getattr(settings, 'VIDEO_CONFIG_CACHE_TTL', 30)
+CONFIG_SHARED_CACHE_TTL = 60*60
+
+_local_config = {'value': None, 'expires': 0}
+
+
+def load_video_config():
+    config = {}
+    try:
+        dbconf = Config.objects.last()
+        config['VIDEO_ENABLED'] = dbconf.video_enabled
+    except AttributeError:
+        config['VIDEO_ENABLED'] = getattr(settings, 'VIDEO_ENABLED', False)
+    return config
+
+
+def get_video_config():
+    """
+    Настройки видеоконтроля: сначала из памяти процесса (``CONFIG_CACHE_TTL``
+    секунд), затем из общего кеша и только потом из БД. При изменении
+    ``Config`` кеш сбрасывается сигналами. Без общего кеша сброс дошел бы
+    только до сохранившего процесса, поэтому настройки перечитываются из БД.
+    """
+    if _local_config['expires'] > time():
+        return _local_config['value']
+    cache = get_video_cache()
+    shared = is_video_cache_shared(cache)
+    config = cache.get(CONFIG_CACHE_KEY) if shared else None
+    if config is None:
+        config = load_video_config()
+        if shared:
+            cache.set(CONFIG_CACHE_KEY, config, CONFIG_SHARED_CACHE_TTL)
+    _local_config.update(value=config, expires=time() + CONFIG_CACHE_TTL)
+    return config
+
+
+def invalidate_video_config():
+    _local_config.update(value=None, expires=0)
+    cache = get_video_cache()
+    if is_video_cache_shared(cache):
+        cache.delete(CONFIG_CACHE_KEY)
 
 
 class ConfigMiddleware(object):
 
     def process_request(self, request):
-        config = {}
-        try:
-            dbconf = Config.objects.last()
-            config['VIDEO_ENABLED'] = dbconf.video_enabled
-        except AttributeError:
-            config['VIDEO_ENABLED'] = getattr(settings, 'VIDEO_ENABLED', False)
-
-        request.config = config
\ No newline at end of file
+        request.config = SimpleLazyObject(lambda: dict(get_video_config()))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.utils.timezone
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+    """
+    Таблицы приложения в том виде, в каком они существовали до первой
+    миграции. На существующих базах применяется с --fake:
+    ``manage.py migrate video 0001 --fake``.
+    """
+
+    dependencies = [
+        ('sales_points', '__first__'),
+        ('profiles', '__first__'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointWebcam',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'verbose_name': 'точка продаж',
+                'verbose_name_plural': 'камеры видеонаблюдения',
+            },
+            bases=('sales_points.point',),
+        ),
+        migrations.CreateModel(
+            name='Webcam',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('name', models.CharField(max_length=255, verbose_name='название')),
+                ('slug', models.SlugField(max_length=255, verbose_name='алиас')),
+                ('online', models.PositiveSmallIntegerField(default=0, verbose_name='статус', choices=[(0, 'не подключена'), (10, 'работает'), (20, 'нет сигнала')])),
+                ('installed', models.DateField(default=django.utils.timezone.now, null=True, verbose_name='установлена', blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='добавлена')),
+                ('ip', models.IPAddressField(default='0.0.0.0', verbose_name='IP-адрес камеры')),
+                ('port', models.PositiveIntegerField(default=554, verbose_name='порт камеры')),
+                ('host', models.URLField(null=True, verbose_name='URL камеры', blank=True)),
+                ('point', models.ForeignKey(related_name='webcams', verbose_name='точка', to='video.PointWebcam')),
+                ('responsible', models.ForeignKey(related_name='responsibles', verbose_name='ответственный', blank=True, to='profiles.Profile', null=True)),
+            ],
+            options={
+                'ordering': ['name'],
+                'verbose_name': 'веб-камера',
+                'verbose_name_plural': 'веб-камеры',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='Config',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('video_enabled', models.BooleanField(default=False, verbose_name='видеоконтроль включен')),
+            ],
+            options={
+                'verbose_name': 'настройка видеоконтроля',
+                'verbose_name_plural': 'настройки видеоконтроля',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.CreateModel(
+            name='PointWebcamFilterTemplate',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('title', models.CharField(max_length=255, verbose_name='Название')),
+                ('filters', jsonfield.fields.JSONField(null=True, blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Добавлен')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Отредактирован')),
+                ('user', models.ForeignKey(verbose_name='Пользователь', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('-created',),
+                'verbose_name': 'шаблон фильтров видеоконтроля',
+                'verbose_name_plural': 'шаблоны фильтров видеоконтроля',
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+# Триграммные индексы под icontains (только PostgreSQL): Django строит
+# условие UPPER("поле"::text) LIKE UPPER(...), индекс должен быть по тому
+# же выражению. (имя индекса, модель, SQL-выражение индекса)
+TRGM_INDEXES = (
+    ('video_webcam_name_trgm', 'video.Webcam', 'UPPER("name"::text)'),
+    ('video_webcam_slug_trgm', 'video.Webcam', 'UPPER("slug"::text)'),
+    ('video_webcam_ip_trgm', 'video.Webcam', 'UPPER(HOST("ip"))'),
+    ('video_point_name_trgm', 'sales_points.Point', 'UPPER("name"::text)'),
+    ('video_point_address_trgm', 'sales_points.Point', 'UPPER("address"::text)'),
+    ('video_city_name_trgm', 'geo.City', 'UPPER("name"::text)'),
+    ('video_profile_last_name_trgm', 'profiles.Profile', 'UPPER("last_name"::text)'),
+)
+
+
+def create_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    qn = schema_editor.quote_name
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, model_label, expression in TRGM_INDEXES:
+        schema_editor.execute('CREATE INDEX {name} ON {table} USING gin ({expression} gin_trgm_ops)'.format(
+            name=qn(name), table=qn(apps.get_model(model_label)._meta.db_table), expression=expression,
+        ))
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, model_label, expression in TRGM_INDEXES:
+        schema_editor.execute('DROP INDEX {}'.format(schema_editor.quote_name(name)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0001_initial'),
+        ('sales_points', '__first__'),
+        ('geo', '__first__'),
+        ('profiles', '__first__'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webcam',
+            name='online',
+            field=models.PositiveSmallIntegerField(default=0, db_index=True, verbose_name='статус', choices=[(0, 'не подключена'), (10, 'работает'), (20, 'нет сигнала')]),
+        ),
+        migrations.AlterField(
+            model_name='webcam',
+            name='installed',
+            field=models.DateField(default=django.utils.timezone.now, null=True, db_index=True, verbose_name='установлена', blank=True),
+        ),
+        migrations.AlterField(
+            model_name='webcam',
+            name='ip',
+            field=models.IPAddressField(default='0.0.0.0', db_index=True, verbose_name='IP-адрес камеры'),
+        ),
+        migrations.AlterIndexTogether(
+            name='webcam',
+            index_together=set([('point', 'slug'), ('name',)]),
+        ),
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
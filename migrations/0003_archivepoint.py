@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivePoint',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('site', models.CharField(max_length=32, verbose_name='сайт медиасервера')),
+                ('rec_date', models.DateField(verbose_name='дата записи', db_index=True)),
+                ('spid', models.CharField(max_length=32, verbose_name='SPID точки')),
+                ('synced', models.DateTimeField(auto_now=True, verbose_name='обновлено')),
+            ],
+            options={
+                'verbose_name': 'запись архива точки',
+                'verbose_name_plural': 'индекс архива',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivepoint',
+            unique_together=set([('site', 'rec_date', 'spid')]),
+        ),
+    ]
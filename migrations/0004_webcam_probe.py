@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0003_archivepoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webcam',
+            name='probe',
+            field=models.CharField(choices=[('get', 'HTTP GET'), ('head', 'HTTP HEAD'), ('rtsp', 'RTSP OPTIONS'), ('tcp', 'TCP-соединение')], max_length=8, blank=True, help_text='Если не задан - VIDEO_MONITOR_PROBE', null=True, verbose_name='способ проверки'),
+            preserve_default=True,
+        ),
+    ]
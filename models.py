@@ -8,7 +8,7 @@ from jsonfield import JSONField
 from sales_points.models import Point
 from snippets.choices import Choices
 from snippets.models import AbstractNameObjects
-from video.utils import SecureLink
+from video.utils import live_stream_url_builder
 
 
 @python_2_unicode_compatible
@@ -20,16 +20,24 @@ class Webcam(AbstractNameObjects):
         (10, 'on', 'работает'),
         (20, 'error', 'нет сигнала'),
     )
+    # Способы проверки доступности (см. video.probes)
+    PROBE_CHOICES = (
+        ('get', 'HTTP GET'),
+        ('head', 'HTTP HEAD'),
+        ('rtsp', 'RTSP OPTIONS'),
+        ('tcp', 'TCP-соединение'),
+    )
     point = models.ForeignKey(
         'PointWebcam', related_name='webcams', verbose_name='точка'
     )
     online = models.PositiveSmallIntegerField(
         'статус',
         choices=WEBCAM_STATUS_CHOICES,
-        default=WEBCAM_STATUS_CHOICES.off
+        default=WEBCAM_STATUS_CHOICES.off,
+        db_index=True
     )
     installed = models.DateField(
-        'установлена', default=now(), null=True, blank=True
+        'установлена', default=now, null=True, blank=True, db_index=True
     )
     created = models.DateTimeField('добавлена', auto_now_add=True)
     responsible = models.ForeignKey(
@@ -37,27 +45,28 @@ class Webcam(AbstractNameObjects):
         verbose_name='ответственный',
         related_name='responsibles',
         null=True, blank=True)
-    ip = models.IPAddressField('IP-адрес камеры', default=DEFAULT_IP)
+    ip = models.IPAddressField('IP-адрес камеры', default=DEFAULT_IP, db_index=True)
     port = models.PositiveIntegerField('порт камеры', default=DEFAULT_PORT)
     host = models.URLField('URL камеры', null=True, blank=True)
+    probe = models.CharField(
+        'способ проверки', max_length=8, choices=PROBE_CHOICES, null=True, blank=True,
+        help_text='Если не задан - VIDEO_MONITOR_PROBE'
+    )
 
     class Meta:
         verbose_name = 'веб-камера'
         verbose_name_plural = 'веб-камеры'
         ordering = ['name', ]
+        index_together = [
+            ('point', 'slug'),
+            ('name', ),
+        ]
 
     def __str__(self):
         return self.name
 
     def live_stream_url(self):
-        signer = SecureLink(format='{value} {secret}')
-        url = 'rtmp://{url}:{port:d}/kam/kam_sp{point}_{cam}'.format(
-            url=getattr(settings, 'MEDIASERVER_URL', ''),
-            port=getattr(settings, 'MEDIASERVER_RTMP_PORT', ''),
-            point=self.point.spid,
-            cam=self.slug,
-            )
-        return signer.sign_live(url)
+        return live_stream_url_builder.build(((self.point.spid, self.slug),))[0]
 
 
 class PointWebcam(Point):
@@ -101,4 +110,20 @@ class PointWebcamFilterTemplate(AbstractFilterTemplate):
     class Meta:
         verbose_name = 'шаблон фильтров видеоконтроля'
         verbose_name_plural = 'шаблоны фильтров видеоконтроля'
-        ordering = ('-created', )
\ No newline at end of file
+        ordering = ('-created', )
+
+
+class ArchivePoint(models.Model):
+    """
+    Индекс архива медиасервера: точка, по которой есть записи за дату.
+    Заполняется командой ``video_sync_archive``.
+    """
+    site = models.CharField('сайт медиасервера', max_length=32)
+    rec_date = models.DateField('дата записи', db_index=True)
+    spid = models.CharField('SPID точки', max_length=32)
+    synced = models.DateTimeField('обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'запись архива точки'
+        verbose_name_plural = 'индекс архива'
+        unique_together = ('site', 'rec_date', 'spid')
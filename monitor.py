@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+import logging
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
+from random import uniform
+from threading import BoundedSemaphore, Lock
+from time import time
+
+from django.conf import settings
+
+from video.events import status_events
+from video.models import Webcam
+from video.probes import PROBES
+from video.utils import bump_list_version, get_shared_video_cache
+
+CHECK_TIMEOUT = getattr(settings, 'VIDEO_MONITOR_TIMEOUT', 1)
+MONITOR_PROBE = getattr(settings, 'VIDEO_MONITOR_PROBE', 'get')
+MONITOR_CONCURRENCY = getattr(settings, 'VIDEO_MONITOR_CONCURRENCY', 32)
+MONITOR_PER_HOST = getattr(settings, 'VIDEO_MONITOR_PER_HOST', 4)
+MONITOR_BUDGET = getattr(settings, 'VIDEO_MONITOR_BUDGET', 5)
+MONITOR_INTERVAL = getattr(settings, 'VIDEO_MONITOR_INTERVAL', 30)
+MONITOR_TICK = getattr(settings, 'VIDEO_MONITOR_TICK', 10)
+MONITOR_MAX_BACKOFF = getattr(settings, 'VIDEO_MONITOR_MAX_BACKOFF', 30*60)
+MONITOR_FLAP_INTERVAL = getattr(settings, 'VIDEO_MONITOR_FLAP_INTERVAL', 10)
+MONITOR_FLAP_THRESHOLD = 2
+MONITOR_JITTER = 0.2
+SNAPSHOT_CACHE_KEY = 'video:monitor:snapshot'
+
+logger = logging.getLogger(__name__)
+
+
+class WebcamProber(object):
+    """
+    Параллельная проверка доступности камер.
+
+    Камеры опрашиваются пулом из ``concurrency`` потоков, но не более
+    ``per_host`` одновременных запросов на один IP. Весь опрос
+    ограничен ``budget`` секундами: камеры, до которых не дошла очередь,
+    в результат не попадают и сохраняют прежний статус.
+
+    Способ проверки (см. video.probes) задается полем ``probe`` камеры,
+    а если оно не заполнено - ``probe`` для всех камер.
+    """
+
+    def __init__(self, concurrency=MONITOR_CONCURRENCY, per_host=MONITOR_PER_HOST,
+                 timeout=CHECK_TIMEOUT, budget=MONITOR_BUDGET, probe=MONITOR_PROBE):
+        if probe not in PROBES:
+            raise ValueError('Unknown webcam probe: {}'.format(probe))
+        self.concurrency = max(int(concurrency), 1)
+        self.per_host = max(int(per_host), 1)
+        self.timeout = timeout
+        self.budget = budget
+        self.probe_name = probe
+        self.probes = dict((name, probe_class(timeout)) for name, probe_class in PROBES.items())
+        self._host_locks = defaultdict(lambda: BoundedSemaphore(self.per_host))
+        self._host_locks_guard = Lock()
+
+    def host_lock(self, host):
+        with self._host_locks_guard:
+            return self._host_locks[host]
+
+    def check(self, ip, port, probe=None):
+        if self.probes[probe or self.probe_name].check(ip, port):
+            return Webcam.WEBCAM_STATUS_CHOICES.on
+        return Webcam.WEBCAM_STATUS_CHOICES.error
+
+    def probe(self, cam):
+        """
+        Возвращает (камера, статус, длительность проверки в секундах или
+        ``None``, если камера не опрашивалась).
+        """
+        if cam.ip == Webcam.DEFAULT_IP:
+            return cam, Webcam.WEBCAM_STATUS_CHOICES.off, None
+        with self.host_lock(cam.ip):
+            started = time()
+            status = self.check(cam.ip, cam.port, cam.probe)
+            return cam, status, time() - started
+
+    def run(self, webcams):
+        """
+        Генератор результатов ``probe`` в порядке завершения проверок.
+        Сетевые запросы выполняются в потоках пула, а сами объекты камер
+        не изменяются, так что сохранять их можно в вызывающем потоке.
+        """
+        webcams = list(webcams)
+        if not webcams:
+            return
+        deadline = time() + self.budget if self.budget else None
+        pool = ThreadPool(min(self.concurrency, len(webcams)))
+        try:
+            results = pool.imap_unordered(self.probe, webcams)
+            for _ in xrange(len(webcams)):
+                remaining = deadline - time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    break
+                try:
+                    yield results.next(remaining)
+                except (TimeoutError, StopIteration):
+                    break
+        finally:
+            # Незапущенные проверки отбрасываются, уже начатые завершатся
+            # сами не позже чем через timeout.
+            pool.terminate()
+
+
+class ProbeState(object):
+    __slots__ = ('status', 'failures', 'flaps', 'next_due')
+
+    def __init__(self, status):
+        self.status = status
+        self.failures = 0
+        self.flaps = 0
+        self.next_due = 0
+
+
+class ProbeScheduler(object):
+    """
+    Расписание проверок камер в процессе опроса. Для каждой камеры
+    хранится последний статус, число неудачных проверок подряд, счетчик
+    смен статуса и время следующей проверки.
+
+    Работающая камера проверяется раз в ``interval`` секунд, неработающая -
+    с экспоненциально растущим интервалом (до ``max_backoff``), камера,
+    статус которой часто меняется, - раз в ``flap_interval``. Интервалы
+    случайно растягиваются или сжимаются на ``jitter``, чтобы проверки
+    камер одной точки не сходились в один цикл.
+    """
+
+    def __init__(self, interval=MONITOR_INTERVAL, max_backoff=MONITOR_MAX_BACKOFF,
+                 flap_interval=MONITOR_FLAP_INTERVAL, flap_threshold=MONITOR_FLAP_THRESHOLD,
+                 jitter=MONITOR_JITTER):
+        self.interval = interval
+        self.max_backoff = max(max_backoff, interval)
+        self.flap_interval = flap_interval
+        self.flap_threshold = flap_threshold
+        self.jitter = jitter
+        self.states = {}
+
+    def split_due(self, webcams, now=None):
+        """
+        Делит камеры на (подлежащие проверке, пропускаемые). Состояние
+        камер, которых больше нет в списке, забывается.
+        """
+        now = time() if now is None else now
+        ids = set(cam.id for cam in webcams)
+        for cam_id in set(self.states) - ids:
+            del self.states[cam_id]
+        due, skipped = [], []
+        for cam in webcams:
+            state = self.states.get(cam.id)
+            if state is None or state.next_due <= now:
+                due.append(cam)
+            else:
+                skipped.append(cam)
+        return due, skipped
+
+    def get_delay(self, state):
+        if state.flaps >= self.flap_threshold:
+            delay = self.flap_interval
+        elif state.failures:
+            delay = min(self.interval * 2 ** (state.failures - 1), self.max_backoff)
+        else:
+            delay = self.interval
+        return delay * uniform(1 - self.jitter, 1 + self.jitter)
+
+    def record(self, cam, status, now=None):
+        now = time() if now is None else now
+        state = self.states.get(cam.id)
+        if state is None:
+            state = self.states[cam.id] = ProbeState(cam.online)
+        if status == state.status:
+            state.flaps = max(state.flaps - 1, 0)
+        else:
+            state.flaps += 1
+        state.status = status
+        if status == Webcam.WEBCAM_STATUS_CHOICES.error:
+            state.failures += 1
+        else:
+            state.failures = 0
+        state.next_due = now + self.get_delay(state)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def get_monitor_queryset():
+    return Webcam.objects.exclude(
+        ip=Webcam.DEFAULT_IP,
+        online=Webcam.WEBCAM_STATUS_CHOICES.off
+    )
+
+
+def save_statuses(changes):
+    """
+    Сохраняет изменившиеся статусы ``{id камеры: статус}`` одним UPDATE
+    на каждое новое значение статуса. Возвращает число обновленных строк.
+    """
+    ids_by_status = defaultdict(list)
+    for cam_id, status in changes.iteritems():
+        ids_by_status[status].append(cam_id)
+    rows_written = sum(
+        Webcam.objects.filter(id__in=ids).update(online=status)
+        for status, ids in ids_by_status.iteritems()
+    )
+    if rows_written:
+        # update() не посылает сигналов, версию списка меняем сами
+        bump_list_version()
+    return rows_written
+
+
+def collect(webcams=None, prober=None, scheduler=None, publish=True):
+    """
+    Опрашивает камеры (с ``scheduler`` - только те, чья проверка по
+    расписанию уже наступила, без него - все), сохраняет изменившиеся
+    статусы и возвращает снимок состояния. Статистика цикла опроса - в
+    ``stats`` снимка.
+
+    С ``publish`` снимок публикуется в общий кеш, откуда его отдает
+    ``PointWebcamMonitor``, а изменения статусов записываются событием в
+    ``status_events`` для потока ``video_events``.
+    """
+    # Проверяется до опроса: снимок из локального кеша никто не увидит
+    cache = get_shared_video_cache() if publish else None
+    webcams = list(get_monitor_queryset() if webcams is None else webcams)
+    prober = prober or WebcamProber()
+    started = time()
+    due, skipped = scheduler.split_due(webcams, started) if scheduler else (webcams, [])
+    changes, deltas, latencies = {}, [], []
+    for cam, status_new, latency in prober.run(due):
+        if latency is not None:
+            latencies.append(latency)
+        if scheduler:
+            scheduler.record(cam, status_new)
+        if cam.online != status_new:
+            deltas.append({'id': cam.id, 'old': cam.online, 'new': status_new})
+            changes[cam.id] = cam.online = status_new
+    duration = time() - started
+    rows_written = save_statuses(changes)
+    if publish:
+        status_events.publish(deltas)
+    stats = {
+        'probed': len(latencies),
+        'skipped': len(skipped),
+        'duration': duration,
+        'rate': len(latencies) / duration if duration else None,
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p95': percentile(latencies, 0.95),
+    }
+    logger.info(
+        'Webcam monitor cycle: probed %d, skipped %d, %.2fs, p50 %s, p95 %s, statuses updated %d',
+        stats['probed'], stats['skipped'], duration,
+        stats['latency_p50'], stats['latency_p95'], rows_written,
+    )
+    snapshot = {
+        'timestamp': time(),
+        'rows_written': rows_written,
+        'stats': stats,
+        'result': {
+            cam.id: {
+                'status': Webcam.WEBCAM_STATUS_CHOICES.get_attr_by_value(cam.online),
+                'status_name': cam.get_online_display(),
+                'ip': cam.ip,
+            }
+            for cam in webcams
+        },
+    }
+    if publish:
+        cache.set(SNAPSHOT_CACHE_KEY, snapshot, None)
+    return snapshot
+
+
+def get_snapshot():
+    return get_shared_video_cache().get(SNAPSHOT_CACHE_KEY)
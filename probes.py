@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import errno
+import select
+import socket
+from time import time
+
+import requests
+from requests.exceptions import RequestException
+
+STATUS_LINE_MAX_LENGTH = 256
+CONNECT_IN_PROGRESS = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY)
+
+
+class Probe(object):
+    """
+    Способ проверки доступности камеры: ``check(ip, port)`` возвращает
+    ``True``, если камера ответила не дольше чем за ``timeout`` секунд.
+    """
+    name = None
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+
+    def check(self, ip, port):
+        raise NotImplementedError
+
+
+class GetProbe(Probe):
+    """
+    HTTP GET через requests: тело ответа скачивается целиком.
+    """
+    name = 'get'
+
+    def check(self, ip, port):
+        try:
+            return requests.get(
+                'http://{ip}:{port}'.format(ip=ip, port=port),
+                timeout=self.timeout
+            ).ok
+        except RequestException:
+            return False
+
+
+class TcpProbe(Probe):
+    """
+    Только TCP-соединение на неблокирующем сокете: камера доступна, если
+    соединение установлено. Наследники после соединения отправляют запрос
+    ``get_request()`` и проверяют строку статуса ответа протокола
+    ``protocol``; тело ответа не читается.
+    """
+    name = 'tcp'
+    protocol = None
+
+    def get_request(self, ip, port):
+        return None
+
+    def check(self, ip, port):
+        deadline = time() + self.timeout
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(0)
+        try:
+            if not self.connect(sock, ip, port, deadline):
+                return False
+            request = self.get_request(ip, port)
+            if request is None:
+                return True
+            return self.is_ok(self.exchange(sock, request, deadline))
+        except (socket.error, select.error):
+            return False
+        finally:
+            sock.close()
+
+    def wait(self, sock, deadline, write=False):
+        remaining = deadline - time()
+        if remaining <= 0:
+            return False
+        readable, writable, failed = select.select(
+            [] if write else [sock], [sock] if write else [], [sock], remaining
+        )
+        return bool(writable if write else readable)
+
+    def connect(self, sock, ip, port, deadline):
+        error = sock.connect_ex((ip, port))
+        if error in CONNECT_IN_PROGRESS:
+            if not self.wait(sock, deadline, write=True):
+                return False
+            error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        return error == 0
+
+    def exchange(self, sock, request, deadline):
+        """
+        Отправляет запрос и возвращает первую строку ответа (или ``None``,
+        если ответа не было до ``deadline``).
+        """
+        while request:
+            if not self.wait(sock, deadline, write=True):
+                return None
+            request = request[sock.send(request):]
+        response = b''
+        while b'\r\n' not in response and len(response) < STATUS_LINE_MAX_LENGTH:
+            if not self.wait(sock, deadline):
+                return None
+            chunk = sock.recv(STATUS_LINE_MAX_LENGTH)
+            if not chunk:
+                break
+            response += chunk
+        return response.split(b'\r\n', 1)[0]
+
+    def is_ok(self, status_line):
+        # "RTSP/1.0 200 OK", "HTTP/1.1 302 Found": как и для GET,
+        # доступной считается камера с кодом ответа меньше 400
+        parts = (status_line or b'').split(None, 2)
+        return (
+            len(parts) > 1 and
+            parts[0].startswith(self.protocol + b'/') and
+            parts[1].isdigit() and
+            int(parts[1]) < 400
+        )
+
+
+class RtspOptionsProbe(TcpProbe):
+    name = 'rtsp'
+    protocol = b'RTSP'
+
+    def get_request(self, ip, port):
+        return (
+            b'OPTIONS rtsp://{ip}:{port}/ RTSP/1.0\r\n'
+            b'CSeq: 1\r\n'
+            b'\r\n'
+        ).format(ip=ip, port=port)
+
+
+class HttpHeadProbe(TcpProbe):
+    name = 'head'
+    protocol = b'HTTP'
+
+    def get_request(self, ip, port):
+        return (
+            b'HEAD / HTTP/1.0\r\n'
+            b'Host: {ip}:{port}\r\n'
+            b'Connection: close\r\n'
+            b'\r\n'
+        ).format(ip=ip, port=port)
+
+
+PROBES = dict(
+    (probe_class.name, probe_class)
+    for probe_class in (GetProbe, TcpProbe, RtspOptionsProbe, HttpHeadProbe)
+)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from profiles.models import Profile
+from sales_points.models import Point
+
+from video.api.autocomplete import autocomplete_index
+from video.middlewares import invalidate_video_config
+from video.models import Config, PointWebcam, Webcam
+from video.utils import bump_list_version, invalidate_admin_responsibles
+
+
+@receiver((post_save, post_delete), sender=Config, dispatch_uid='video_config_changed')
+def config_changed(sender, **kwargs):
+    invalidate_video_config()
+
+
+@receiver(post_save, sender=Webcam, dispatch_uid='video_autocomplete_webcam_saved')
+def autocomplete_webcam_saved(sender, instance, **kwargs):
+    autocomplete_index.add_instance(instance)
+
+
+@receiver(post_save, sender=Point, dispatch_uid='video_autocomplete_point_saved')
+@receiver(post_save, sender=PointWebcam, dispatch_uid='video_autocomplete_pointwebcam_saved')
+def autocomplete_point_saved(sender, instance, **kwargs):
+    autocomplete_index.add_instance(instance, is_point=True)
+
+
+@receiver(post_delete, sender=Webcam, dispatch_uid='video_autocomplete_webcam_deleted')
+@receiver(post_delete, sender=Point, dispatch_uid='video_autocomplete_point_deleted')
+@receiver(post_delete, sender=PointWebcam, dispatch_uid='video_autocomplete_pointwebcam_deleted')
+def autocomplete_object_deleted(sender, **kwargs):
+    autocomplete_index.clear()
+
+
+@receiver((post_save, post_delete), sender=Webcam, dispatch_uid='video_list_webcam_changed')
+@receiver((post_save, post_delete), sender=Point, dispatch_uid='video_list_point_changed')
+@receiver((post_save, post_delete), sender=PointWebcam, dispatch_uid='video_list_pointwebcam_changed')
+@receiver((post_save, post_delete), sender=Profile, dispatch_uid='video_list_profile_changed')
+def list_data_changed(sender, **kwargs):
+    bump_list_version()
+
+
+@receiver((post_save, post_delete), sender=Webcam, dispatch_uid='video_admin_responsibles_webcam_changed')
+@receiver((post_save, post_delete), sender=Profile, dispatch_uid='video_admin_responsibles_profile_changed')
+def admin_responsibles_changed(sender, **kwargs):
+    invalidate_admin_responsibles()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from geo.models import City
+from profiles.models import Profile
+from sales_points.models import Point
+
+from video.models import Webcam
+
+
+def create_profile(username, first_name='', last_name=''):
+    return Profile.objects.create(username=username, first_name=first_name, last_name=last_name)
+
+
+def create_fleet(points, webcams_per_point=1, responsibles=()):
+    """
+    Точки с камерами для тестов: ``points`` точек по ``webcams_per_point``
+    камер, ответственные назначаются по кругу из ``responsibles``.
+    Возвращает список созданных камер в порядке создания.
+    """
+    city, created = City.objects.get_or_create(name='Москва')
+    first = Point.objects.count() + 1
+    spids = ['{}'.format(n) for n in xrange(first, first + points)]
+    Point.objects.bulk_create([
+        Point(spid=spid, name='Точка {}'.format(spid), address='ул. Тестовая, {}'.format(spid), city=city)
+        for spid in spids
+    ])
+    webcams = []
+    offset = Webcam.objects.count()
+    for point in Point.objects.filter(spid__in=spids).order_by('id'):
+        for n in xrange(1, webcams_per_point + 1):
+            number = offset + len(webcams)
+            webcams.append(Webcam(
+                point=point,
+                name='Камера {}'.format(number),
+                slug='kamera-{}'.format(number),
+                ip='10.{}.{}.{}'.format(number // 65536 % 256, number // 256 % 256, number % 256),
+                online=Webcam.WEBCAM_STATUS_CHOICES.on,
+                responsible=responsibles[number % len(responsibles)] if responsibles else None,
+            ))
+    Webcam.objects.bulk_create(webcams, batch_size=1000)
+    return list(Webcam.objects.filter(point__spid__in=spids).order_by('id'))
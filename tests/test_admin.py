@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from profiles.models import Profile
+
+from video.admin import get_admin_responsibles
+from video.models import Webcam
+from video.tests.fleet import create_fleet, create_profile
+from video.utils import invalidate_admin_responsibles
+
+
+class PointWebcamAdminQueriesTest(TestCase):
+
+    def setUp(self):
+        Profile.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+        self.responsibles = [
+            create_profile('responsible{}'.format(n), 'Имя{}'.format(n), 'Фамилия{}'.format(n))
+            for n in xrange(5)
+        ]
+        self.url = reverse('admin:video_pointwebcam_changelist')
+
+    def count_queries(self, **params):
+        # Фикстуры создаются через bulk_create, без сигналов
+        invalidate_admin_responsibles()
+        self.client.get(self.url, params)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_fleet_size(self):
+        create_fleet(points=10, webcams_per_point=2, responsibles=self.responsibles)
+        small = self.count_queries()
+        create_fleet(points=2000, webcams_per_point=5, responsibles=self.responsibles)
+        self.assertEqual(self.count_queries(), small)
+
+    def test_filters_do_not_add_queries_per_row(self):
+        create_fleet(points=200, webcams_per_point=5, responsibles=self.responsibles)
+        unfiltered = self.count_queries()
+        self.assertEqual(self.count_queries(status='10', responsible=str(self.responsibles[0].id)), unfiltered)
+
+
+class AdminResponsiblesTest(TestCase):
+
+    def test_labels_match_get_full_name(self):
+        responsibles = [create_profile('responsible{}'.format(n), 'Имя{}'.format(n), 'Фамилия{}'.format(n))
+                        for n in xrange(3)]
+        create_profile('idle', 'Без', 'Камер')
+        create_fleet(points=3, responsibles=responsibles)
+        invalidate_admin_responsibles()
+        self.assertEqual(
+            dict(get_admin_responsibles()),
+            dict((profile.id, profile.get_full_name()) for profile in responsibles),
+        )
+
+    def test_changelist_names_responsibles_missing_from_cache(self):
+        Profile.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.client.login(username='admin', password='admin')
+        create_fleet(points=3)
+        responsible = create_profile('newcomer', 'Новый', 'Ответственный')
+        invalidate_admin_responsibles()
+        get_admin_responsibles()
+        # update() не посылает сигналов: справочник в кеше устарел
+        Webcam.objects.update(responsible=responsible)
+        response = self.client.get(reverse('admin:video_pointwebcam_changelist'))
+        self.assertContains(response, responsible.get_full_name())
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from urlparse import parse_qs, urlsplit
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from video.api.views import PointWebcamList, PointWebcamMonitor
+from video.models import Webcam
+from video.tests.fleet import create_fleet, create_profile
+
+
+class PointWebcamListQueriesTest(TestCase):
+
+    def setUp(self):
+        self.user = create_profile('viewer')
+        self.responsibles = [
+            create_profile('responsible{}'.format(n), 'Имя{}'.format(n), 'Фамилия{}'.format(n))
+            for n in xrange(3)
+        ]
+        create_fleet(points=40, webcams_per_point=2, responsibles=self.responsibles)
+        self.factory = APIRequestFactory()
+
+    def get_list(self, **params):
+        request = self.factory.get('/pointwebcamlist/', params)
+        force_authenticate(request, user=self.user)
+        return PointWebcamList.as_view()(request)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for per_page in (5, 50):
+            # COUNT и страница с точкой, городом, сетью и ответственным
+            with self.assertNumQueries(2):
+                response = self.get_list(per_page=per_page)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), per_page)
+
+    def test_cursor_query_count_does_not_depend_on_page_size(self):
+        for per_page in (5, 50):
+            with self.assertNumQueries(1):
+                response = self.get_list(per_page=per_page, cursor='')
+            self.assertEqual(len(response.data['results']), per_page)
+
+    def test_responsible_name_is_loaded_with_page(self):
+        # only() + select_related('responsible'): get_full_name() не
+        # должен догружать отложенные поля ответственного
+        with self.assertNumQueries(2):
+            response = self.get_list(per_page=10)
+        names = dict((profile.id, profile.get_full_name()) for profile in self.responsibles)
+        for row in response.data['results']:
+            self.assertEqual(row['responsible']['last_name'], names[row['responsible']['id']])
+
+
+class PointWebcamListCursorTest(TestCase):
+
+    def setUp(self):
+        self.user = create_profile('viewer')
+        create_fleet(points=5, webcams_per_point=2)
+        self.factory = APIRequestFactory()
+
+    def get_list(self, **params):
+        request = self.factory.get('/pointwebcamlist/', params)
+        force_authenticate(request, user=self.user)
+        return PointWebcamList.as_view()(request)
+
+    def test_sort_by_trade_network_uses_network_name(self):
+        response = self.get_list(cursor='', per_page=3, sort_by='["point.trade_network"]')
+        self.assertEqual(response.status_code, 200)
+        cursor = parse_qs(urlsplit(response.data['next']).query)['cursor'][0]
+        response = self.get_list(cursor=cursor, per_page=3, sort_by='["point.trade_network"]')
+        self.assertEqual(response.status_code, 200)
+
+    def test_sort_by_relation_is_rejected(self):
+        response = self.get_list(cursor='', sort_by='["point"]')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(VIDEO_CACHE_ALIAS='video-not-configured')
+class PointWebcamMonitorLocalCacheTest(TestCase):
+
+    def setUp(self):
+        self.user = create_profile('viewer')
+        # Камеры без адреса не опрашиваются по сети и получают статус "off"
+        self.webcams = create_fleet(points=2, webcams_per_point=2)
+        Webcam.objects.update(ip=Webcam.DEFAULT_IP)
+        self.factory = APIRequestFactory()
+
+    def get_status(self, **params):
+        request = self.factory.get('/check-status/', params)
+        force_authenticate(request, user=self.user)
+        return PointWebcamMonitor.as_view()(request)
+
+    def test_collects_live_without_shared_cache(self):
+        response = self.get_status()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), set(cam.id for cam in self.webcams))
+        self.assertEqual(response['X-Rows-Written'], str(len(self.webcams)))
+        # Выключенные камеры без адреса больше не опрашиваются
+        response = self.get_status(refresh=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {})
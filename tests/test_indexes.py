@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+from datetime import date
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from geo.models import City
+from profiles.models import Profile
+from sales_points.models import Point
+
+from video.models import Webcam
+from video.tests.fleet import create_fleet
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN-проверка индексов только для PostgreSQL')
+class HotQueryIndexesTest(TestCase):
+    """
+    Основные запросы видеоконтроля на заполненных таблицах используют
+    свои индексы (seq scan не запрещается, планировщик выбирает сам).
+    Сортировка по умолчанию (``Meta.ordering``) снимается везде, кроме
+    запроса сортировки, иначе план идет по индексу ``name``.
+    """
+
+    def setUp(self):
+        self.webcams = create_fleet(points=1000, webcams_per_point=5)
+        Webcam.objects.filter(id__in=[cam.id for cam in self.webcams[:5]]).update(
+            online=Webcam.WEBCAM_STATUS_CHOICES.error, installed=date(2001, 1, 1),
+        )
+        City.objects.bulk_create([City(name='Город {}'.format(n)) for n in xrange(1000)])
+        Profile.objects.bulk_create([
+            Profile(username='user{}'.format(n), first_name='Имя{}'.format(n), last_name='Фамилия{}'.format(n))
+            for n in xrange(1000)
+        ])
+        with connection.cursor() as cursor:
+            for model in (Webcam, Point, City, Profile):
+                cursor.execute('ANALYZE {}'.format(connection.ops.quote_name(model._meta.db_table)))
+
+    def get_index_name(self, model, columns):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        for name, info in constraints.items():
+            if info['index'] and not info['primary_key'] and info['columns'] == list(columns):
+                return name
+        self.fail('Нет индекса {} по {}'.format(model._meta.db_table, columns))
+
+    def get_plan(self, queryset):
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql, params)
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def get_hot_queries(self):
+        webcams = Webcam.objects.order_by()
+        cam = self.webcams[1234]
+        return (
+            ('archive-list object', webcams.filter(point_id=cam.point_id, slug=cam.slug),
+             self.get_index_name(Webcam, ['point_id', 'slug'])),
+            ('filter online', webcams.filter(online=Webcam.WEBCAM_STATUS_CHOICES.error),
+             self.get_index_name(Webcam, ['online'])),
+            ('filter installed', webcams.filter(installed__lt=date(2002, 1, 1)),
+             self.get_index_name(Webcam, ['installed'])),
+            ('filter ip', webcams.filter(ip=cam.ip),
+             self.get_index_name(Webcam, ['ip'])),
+            ('sort name', Webcam.objects.order_by('name')[:20],
+             self.get_index_name(Webcam, ['name'])),
+            ('autocomplete name', webcams.filter(name__icontains='Камера 1234'), 'video_webcam_name_trgm'),
+            ('autocomplete ip', webcams.filter(ip__icontains='.4.123'), 'video_webcam_ip_trgm'),
+            ('autocomplete point.name', Point.objects.order_by().filter(name__icontains='Точка 777'),
+             'video_point_name_trgm'),
+            ('autocomplete point.address', Point.objects.order_by().filter(address__icontains='Тестовая, 777'),
+             'video_point_address_trgm'),
+            ('autocomplete point.city.name', City.objects.order_by().filter(name__icontains='Город 321'),
+             'video_city_name_trgm'),
+            ('autocomplete responsible', Profile.objects.order_by().filter(last_name__icontains='Фамилия321'),
+             'video_profile_last_name_trgm'),
+        )
+
+    def test_hot_queries_use_expected_indexes(self):
+        for name, queryset, index_name in self.get_hot_queries():
+            plan = self.get_plan(queryset)
+            self.assertIn(index_name, plan, '{}: ожидался индекс {}\n{}'.format(name, index_name, plan))
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.test import TestCase
+from django.utils import timezone
+
+from video.mediaserver import ArchiveIndex
+from video.utils import get_list_version
+
+
+class FakeMediaServerClient(object):
+
+    def __init__(self, points_by_date):
+        # {дата ISO: [SPID, ...]}
+        self.points_by_date = points_by_date
+        self.requested = []
+
+    def get(self, path):
+        self.requested.append(path)
+        if path.startswith('archive_dates/'):
+            return [
+                timezone.datetime.strptime(_date, '%Y-%m-%d').strftime('%d-%m-%Y')
+                for _date in self.points_by_date
+            ]
+        return self.points_by_date[path.rstrip('/').rsplit('/', 1)[1]]
+
+
+class ArchiveIndexTest(TestCase):
+
+    def setUp(self):
+        self.index = ArchiveIndex(site='test')
+
+    def test_sync_stores_points_by_date(self):
+        client = FakeMediaServerClient({'2015-01-15': [100, 101], '2015-01-16': ['102']})
+        self.assertEqual(self.index.sync(client), 2)
+        self.assertEqual(self.index.get_dates(), ['2015-01-16', '2015-01-15'])
+        self.assertEqual(self.index.get_points('2015-01-15'), set(['100', '101']))
+        self.assertEqual(self.index.get_points('2015-01-15', '2015-01-16'), set(['100', '101', '102']))
+        self.assertIsNotNone(self.index.get_synced())
+
+    def test_sync_skips_indexed_dates_and_drops_removed(self):
+        self.index.sync(FakeMediaServerClient({'2015-01-15': [100], '2015-01-16': [101]}))
+        client = FakeMediaServerClient({'2015-01-16': [101], '2015-01-17': [102]})
+        self.assertEqual(self.index.sync(client), 1)
+        self.assertNotIn('points_by_date/test/2015-01-16/', client.requested)
+        self.assertEqual(self.index.get_dates(), ['2015-01-17', '2015-01-16'])
+        self.assertEqual(self.index.get_points('2015-01-15'), set())
+
+    def test_sync_bumps_list_version_only_on_changes(self):
+        points_by_date = {'2015-01-15': [100], '2015-01-16': [101]}
+        version = get_list_version()
+        self.index.sync(FakeMediaServerClient(points_by_date))
+        self.assertNotEqual(get_list_version(), version)
+        version = get_list_version()
+        self.index.sync(FakeMediaServerClient(points_by_date), full=True)
+        self.assertEqual(get_list_version(), version)
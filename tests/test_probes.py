@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import socket
+from SocketServer import BaseRequestHandler, ThreadingTCPServer
+import threading
+
+from django.test import SimpleTestCase
+
+from video.models import Webcam
+from video.probes import PROBES, HttpHeadProbe, RtspOptionsProbe, TcpProbe
+
+
+class FakeCameraHandler(BaseRequestHandler):
+
+    def handle(self):
+        request = self.request.recv(1024)
+        reply = self.server.reply
+        if callable(reply):
+            reply = reply(request)
+        if reply:
+            self.request.sendall(reply)
+
+
+class FakeCameraServer(ThreadingTCPServer):
+    """
+    Локальная "камера": на каждый запрос отвечает ``reply`` (байты или
+    функция от запроса), при ``reply=None`` молчит.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, reply):
+        ThreadingTCPServer.__init__(self, ('127.0.0.1', 0), FakeCameraHandler)
+        self.reply = reply
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+def get_closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def rtsp_reply(request):
+    if request.startswith(b'OPTIONS rtsp://') and b'CSeq: 1' in request:
+        return b'RTSP/1.0 200 OK\r\nCSeq: 1\r\nPublic: DESCRIBE, SETUP, PLAY\r\n\r\n'
+    return b'RTSP/1.0 400 Bad Request\r\n\r\n'
+
+
+def http_reply(request):
+    if request.startswith(b'HEAD / HTTP/1.0\r\n'):
+        return b'HTTP/1.0 200 OK\r\nContent-Length: 100000\r\n\r\n'
+    return b'HTTP/1.0 405 Method Not Allowed\r\n\r\n'
+
+
+class ProbesTest(SimpleTestCase):
+    timeout = 0.5
+
+    def start_server(self, reply):
+        server = FakeCameraServer(reply)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_probe_names_match_model_choices(self):
+        self.assertEqual(set(PROBES), set(name for name, title in Webcam.PROBE_CHOICES))
+
+    def test_tcp(self):
+        server = self.start_server(None)
+        self.assertTrue(TcpProbe(self.timeout).check('127.0.0.1', server.port))
+        self.assertFalse(TcpProbe(self.timeout).check('127.0.0.1', get_closed_port()))
+
+    def test_rtsp(self):
+        server = self.start_server(rtsp_reply)
+        self.assertTrue(RtspOptionsProbe(self.timeout).check('127.0.0.1', server.port))
+        self.assertFalse(RtspOptionsProbe(self.timeout).check('127.0.0.1', get_closed_port()))
+
+    def test_rtsp_rejects_other_protocol(self):
+        server = self.start_server(http_reply)
+        self.assertFalse(RtspOptionsProbe(self.timeout).check('127.0.0.1', server.port))
+
+    def test_head(self):
+        server = self.start_server(http_reply)
+        self.assertTrue(HttpHeadProbe(self.timeout).check('127.0.0.1', server.port))
+        self.assertFalse(HttpHeadProbe(self.timeout).check('127.0.0.1', get_closed_port()))
+
+    def test_head_error_status(self):
+        server = self.start_server(b'HTTP/1.1 503 Service Unavailable\r\n\r\n')
+        self.assertFalse(HttpHeadProbe(self.timeout).check('127.0.0.1', server.port))
+
+    def test_silent_camera_times_out(self):
+        server = self.start_server(None)
+        for probe_class in (RtspOptionsProbe, HttpHeadProbe):
+            self.assertFalse(probe_class(self.timeout).check('127.0.0.1', server.port))
@@ -2,54 +2,192 @@
 from base64 import urlsafe_b64encode
 from hashlib import md5
 from time import time
-from urlparse import urlparse, urlunparse, ParseResult
+from urlparse import urlsplit, urlunsplit
 from django.conf import settings
-from django.utils.http import urlencode
+from django.core.cache import caches, InvalidCacheBackendError
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from profiles.models import Profile
+
+_fallback_cache = None
 
 
 class SecureLink(object):
+    """
+    Подпись ссылок на медиасервер (secure link): к URL добавляются
+    параметры ``st`` (подпись) и ``e`` (срок действия).
+
+    При заданном ``bucket`` срок действия округляется вверх до границы
+    окна в ``bucket`` секунд, так что в пределах окна подпись ссылки не
+    меняется и подписанные ссылки запоминаются.
+    """
     DEFAULT_TIMEOUT = 60*60
 
-    def __init__(self, timeout=DEFAULT_TIMEOUT, format='{value}{expiration} {secret}'):
+    def __init__(self, timeout=DEFAULT_TIMEOUT, format='{value}{expiration} {secret}', bucket=None):
         self.secret = getattr(settings, 'MEDIASERVER_KEY', '')
         self.timeout = timeout
         self.format = format
+        self.bucket = bucket
+        self._signed = {}
+        self._signed_expiration = None
 
     def get_expiration(self):
-        if self.timeout is not None:
-            return str(int(self.timeout+time()))
-        return ''
+        if self.timeout is None:
+            return ''
+        expiration = int(self.timeout + time())
+        if self.bucket:
+            expiration = (expiration // self.bucket + 1) * self.bucket
+        return str(expiration)
 
-    def signature(self, s):
-        expiration = self.get_expiration()
+    def signature(self, s, expiration=None):
+        if expiration is None:
+            expiration = self.get_expiration()
         string = self.format.format(
             value=s,
-            expiration=self.get_expiration(),
+            expiration=expiration,
             secret=self.secret,
         )
         return urlsafe_b64encode(md5(string).digest()).rstrip('='), \
                expiration
 
+    def sign_url(self, url, expiration):
+        scheme, netloc, path, query, fragment = urlsplit(url)
+        sig, exp = self.signature(path, expiration)
+        # st и e не требуют экранирования: base64url и число
+        signed_query = 'st={}&e={}'.format(sig, exp)
+        if query:
+            signed_query = '{}&{}'.format(query, signed_query)
+        return urlunsplit((scheme, netloc, path, signed_query, fragment))
+
+    def sign_many(self, urls):
+        """
+        Подписывает ссылки с одним сроком действия на всю пачку.
+        """
+        expiration = self.get_expiration()
+        if not self.bucket:
+            return [self.sign_url(url, expiration) for url in urls]
+
+        if expiration != self._signed_expiration:
+            self._signed = {}
+            self._signed_expiration = expiration
+        result = []
+        for url in urls:
+            signed = self._signed.get(url)
+            if signed is None:
+                signed = self._signed[url] = self.sign_url(url, expiration)
+            result.append(signed)
+        return result
+
     def sign(self, url):
-        parsed = urlparse(url)
-        sig, exp = self.signature(parsed.path)
-
-        qs = parsed.query
-        urlencode(qs)
-        if qs:
-            qs += '&'
-        qs += urlencode(dict(st=sig, e=exp))
-
-        return urlunparse(
-            ParseResult(
-                parsed.scheme,
-                parsed.netloc,
-                parsed.path,
-                parsed.params,
-                qs,
-                parsed.fragment
-            )
-        )
+        return self.sign_many((url,))[0]
 
     def sign_live(self, url):
-        return sign(url)
\ No newline at end of file
+        return self.sign(url)
+
+
+class LiveStreamURLBuilder(object):
+    """
+    Подписанные ссылки на трансляции камер. Шаблон адреса и ключ
+    подписи определяются один раз при создании.
+    """
+
+    def __init__(self):
+        self.template = 'rtmp://{url}:{port}/kam/kam_sp{{point}}_{{cam}}'.format(
+            url=getattr(settings, 'MEDIASERVER_URL', ''),
+            port=getattr(settings, 'MEDIASERVER_RTMP_PORT', ''),
+        )
+        self.signer = SecureLink(format='{value} {secret}')
+
+    def build(self, pairs):
+        """
+        ``pairs`` - пары (SPID точки, slug камеры).
+        """
+        return self.signer.sign_many(
+            self.template.format(point=spid, cam=slug) for spid, slug in pairs
+        )
+
+
+def get_video_cache():
+    """
+    Кеш видеоконтроля: бэкенд ``VIDEO_CACHE_ALIAS`` из ``CACHES``, а если он
+    не настроен - локальный кеш процесса.
+    """
+    global _fallback_cache
+    try:
+        return caches[getattr(settings, 'VIDEO_CACHE_ALIAS', 'video')]
+    except InvalidCacheBackendError:
+        if _fallback_cache is None:
+            _fallback_cache = LocMemCache('video', {})
+        return _fallback_cache
+
+
+def is_video_cache_shared(cache=None):
+    """
+    Видят ли кеш видеоконтроля другие процессы (не локальный и не dummy).
+    """
+    cache = cache or get_video_cache()
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def get_shared_video_cache():
+    """
+    Кеш видеоконтроля для данных, которые пишет один процесс (например,
+    ``video_monitor``), а читают другие. Без общего кеша такие данные
+    молча терялись бы, поэтому возбуждается ``ImproperlyConfigured``.
+    """
+    cache = get_video_cache()
+    if not is_video_cache_shared(cache):
+        raise ImproperlyConfigured(
+            'VIDEO_CACHE_ALIAS ({}) must name a cache shared between processes '
+            '(memcached, redis, database)'.format(getattr(settings, 'VIDEO_CACHE_ALIAS', 'video'))
+        )
+    return cache
+
+
+LIST_VERSION_CACHE_KEY = 'video:list:version'
+
+
+def get_list_version():
+    """
+    Номер версии данных списка камер; меняется при любом изменении камер,
+    точек и ответственных (см. video.signals) и статусов камер. Имеет
+    смысл только в общем кеше (см. ``is_video_cache_shared``).
+    """
+    cache = get_video_cache()
+    version = cache.get(LIST_VERSION_CACHE_KEY)
+    if version is None:
+        # Начальное значение от времени, чтобы после очистки кеша
+        # версии не совпали с выданными ранее
+        cache.add(LIST_VERSION_CACHE_KEY, int(time() * 1000), None)
+        version = cache.get(LIST_VERSION_CACHE_KEY)
+    return version
+
+
+def bump_list_version():
+    cache = get_video_cache()
+    try:
+        cache.incr(LIST_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(LIST_VERSION_CACHE_KEY, int(time() * 1000), None)
+
+
+def get_responsible_names():
+    """
+    Ответственные, за которыми закреплены камеры: ``{id профиля:
+    Profile.get_full_name()}`` - те же подписи, что в строках API списка.
+    """
+    return dict(
+        (profile.id, profile.get_full_name())
+        for profile in Profile.objects.filter(responsibles__isnull=False).distinct()
+    )
+
+
+ADMIN_RESPONSIBLES_CACHE_KEY = 'video:admin:responsibles'
+
+
+def invalidate_admin_responsibles():
+    get_video_cache().delete(ADMIN_RESPONSIBLES_CACHE_KEY)
+
+
+live_stream_url_builder = LiveStreamURLBuilder()